@@ -0,0 +1,133 @@
+"""Offline benchmark of fileio_wrapper against a local stand-in of file.io
+
+Every scenario runs in its own process, so peak RSS and CPU time belong to that scenario only.
+The stand-in server runs in another process, so its memory and CPU are not counted either.
+
+Usage:
+    python benchmarks/bench_fileio.py
+    python benchmarks/bench_fileio.py --sizes 1024,1048576 --ops 50 --latency 0.01 --json bench.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from fileio_wrapper import Fileio
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SCENARIOS = ('upload', 'download', 'list', 'upload_many', 'download_many')
+
+
+def peak_rss() -> int:
+    """Peak resident set size of current process in bytes, 0 if not supported"""
+    if resource is None:
+        return 0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run_scenario(url: str, scenario: str, size: int, ops: int, workers: int) -> dict:
+    """Run a scenario in current process and measure it"""
+    fileio = Fileio('bench-api-key', pool_size=workers, max_workers=workers)
+    fileio.url = url
+    workdir = tempfile.mkdtemp(prefix='fileio_bench_')
+    path = os.path.join(workdir, 'payload.bin')
+    with open(path, 'wb') as f:
+        block = os.urandom(max(1, min(size, 1024 * 1024)))
+        for offset in range(0, size, len(block)):
+            f.write(block[:size - offset])
+
+    keys = []
+    if scenario in ('download', 'download_many', 'list'):
+        keys = [resp['key'] for _, resp in fileio.upload_many([path] * ops)]
+
+    latencies = []
+    fileio.add_hook('request_end', lambda info: latencies.append(info['total']))
+    cpu, wall = time.process_time(), time.perf_counter()
+    if scenario == 'upload':
+        results = [fileio.upload(path) for _ in range(ops)]
+    elif scenario == 'download':
+        results = [fileio.download(key, os.path.join(workdir, 'out.bin')) for key in keys]
+    elif scenario == 'list':
+        results = [fileio.list() for _ in range(ops)]
+    elif scenario == 'upload_many':
+        results = [resp for _, resp in fileio.upload_many([path] * ops)]
+    else:
+        results = [resp for _, resp in fileio.download_many(keys, workdir)]
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    fileio.close()
+
+    moved = size * ops if scenario != 'list' else sum(len(json.dumps(resp.to_dict())) for resp in results)
+    return {
+        'scenario': scenario,
+        'size': size if scenario != 'list' else ops,
+        'ops': ops,
+        'errors': sum(not resp['success'] for resp in results),
+        'ops_per_second': ops / wall if wall else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+        'peak_rss': peak_rss(),
+        'cpu_ns_per_byte': cpu * 1e9 / moved if moved else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1024,1048576,33554432', help='comma separated file sizes in bytes')
+    parser.add_argument('--ops', type=int, default=20, help='operations per scenario')
+    parser.add_argument('--workers', type=int, default=8, help='threads of batch scenarios')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma separated scenarios to run')
+    parser.add_argument('--latency', type=float, default=0.0, help='latency of stand-in server in seconds')
+    parser.add_argument('--bandwidth', type=float, default=None, help='bandwidth of stand-in server in bytes/sec')
+    parser.add_argument('--json', help='write results to this file as JSON')
+    parser.add_argument('--worker', nargs=5, metavar=('URL', 'SCENARIO', 'SIZE', 'OPS', 'WORKERS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        url, scenario, size, ops, workers = args.worker
+        print(json.dumps(run_scenario(url, scenario, int(size), int(ops), int(workers))))
+        return
+
+    command = [sys.executable, '-m', 'fileio_wrapper.mock_server', '--port', '0', '--latency', str(args.latency)]
+    if args.bandwidth:
+        command += ['--bandwidth', str(args.bandwidth)]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, env=env, universal_newlines=True)
+    try:
+        url = server.stdout.readline().strip()
+        results = []
+        print('{:<14}{:>12}{:>8}{:>12}{:>12}{:>12}{:>12}{:>12}'.format(
+            'scenario', 'size', 'errors', 'ops/sec', 'p50 ms', 'p99 ms', 'rss MiB', 'cpu ns/B'))
+        for scenario in args.scenarios.split(','):
+            for size in ([0] if scenario == 'list' else [int(size) for size in args.sizes.split(',')]):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--worker', url, scenario, str(size), str(args.ops),
+                     str(args.workers)], stdout=subprocess.PIPE, env=env, universal_newlines=True, check=True).stdout
+                result = json.loads(output)
+                results.append(result)
+                print('{:<14}{:>12}{:>8}{:>12.1f}{:>12.2f}{:>12.2f}{:>12.1f}{:>12.2f}'.format(
+                    result['scenario'], result['size'], result['errors'], result['ops_per_second'],
+                    result['p50'] * 1000, result['p99'] * 1000, result['peak_rss'] / 1024 / 1024,
+                    result['cpu_ns_per_byte']))
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
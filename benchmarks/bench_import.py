@@ -0,0 +1,65 @@
+"""Import time benchmark of fileio_wrapper
+
+Every sample imports the package in a fresh interpreter, so nothing is cached in sys.modules.
+Heavy dependencies (requests, urllib3, aiohttp) are expected to load on first request only.
+
+Usage:
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --runs 50 --statement "from fileio_wrapper import Fileio" --json import.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+HEAVY = ('requests', 'urllib3', 'aiohttp', 'asyncio', 'concurrent.futures', 'tarfile')
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps([elapsed, [name for name in {heavy!r} if name in sys.modules]]))
+'''
+
+
+def sample(statement: str) -> tuple:
+    """Import in a fresh interpreter, return seconds taken and heavy modules loaded"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC, os.environ.get('PYTHONPATH', '')]))
+    output = subprocess.run([sys.executable, '-c', PROBE.format(statement=statement, heavy=HEAVY)],
+                            stdout=subprocess.PIPE, env=env, universal_newlines=True, check=True).stdout
+    return tuple(json.loads(output))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20, help='fresh interpreters per statement')
+    parser.add_argument('--statement', action='append', help='import statement to time, may be repeated')
+    parser.add_argument('--json', help='write results to this file as JSON')
+    args = parser.parse_args()
+
+    statements = args.statement or ['import fileio_wrapper', 'from fileio_wrapper import Fileio',
+                                    'from fileio_wrapper.cli import main']
+    results = []
+    print('{:<40}{:>10}{:>10}  {}'.format('statement', 'p50 ms', 'max ms', 'heavy modules loaded'))
+    for statement in statements:
+        samples = [sample(statement) for _ in range(args.runs)]
+        seconds = [elapsed for elapsed, _ in samples]
+        result = {
+            'statement': statement,
+            'p50': statistics.median(seconds),
+            'max': max(seconds),
+            'heavy_modules': samples[-1][1],
+        }
+        results.append(result)
+        print('{:<40}{:>10.2f}{:>10.2f}  {}'.format(statement, result['p50'] * 1000, result['max'] * 1000,
+                                                   ', '.join(result['heavy_modules']) or '-'))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
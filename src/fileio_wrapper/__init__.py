@@ -1,2 +1,35 @@
-from .fileio_wrapper import Fileio
 from .__version__ import __version__
+
+# Public names and the submodule defining each. Submodules are imported on first access (PEP 562),
+# so `import fileio_wrapper` stays cheap for short-lived processes
+_exports = {
+    'Fileio': 'fileio_wrapper',
+    'FileioError': 'fileio_wrapper',
+    'AsyncFileio': 'async_fileio',
+    'RetryPolicy': 'retry',
+    'MetadataCache': 'cache',
+    'DedupIndex': 'dedup',
+    'UploadJournal': 'journal',
+    'LifecycleManager': 'lifecycle',
+    'MetricsCollector': 'metrics',
+    'FileNode': 'results',
+    'UploadResult': 'results',
+    'ListResult': 'results',
+    'AccountInfo': 'results',
+    'DownloadResult': 'results',
+}
+
+__all__ = list(_exports) + ['__version__']
+
+
+def __getattr__(name: str):
+    if name not in _exports:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    import importlib
+    value = getattr(importlib.import_module('.' + _exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,108 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+
+# Suffix appended to filename of compressed uploads. It is specific to fileio_wrapper, so a .gz file uploaded as is
+# is never decompressed on download
+SUFFIXES = {
+    'gzip': '.fileio.gz',
+    'zstd': '.fileio.zst',
+    'lz4': '.fileio.lz4',
+}
+
+
+class _Lz4Decompressor(object):
+    """lz4.frame decompressor with the flush method zlib and zstandard decompressors have"""
+
+    def __init__(self) -> None:
+        import lz4.frame
+        self._decompressor = lz4.frame.LZ4FrameDecompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return b''
+
+
+class _Lz4Compressor(object):
+    """lz4.frame compressor with the compress/flush interface of zlib compressors"""
+
+    def __init__(self, level: Optional[int]) -> None:
+        import lz4.frame
+        self._compressor = lz4.frame.LZ4FrameCompressor(compression_level=level or 0)
+        self._header = self._compressor.begin()
+
+    def compress(self, data: bytes) -> bytes:
+        header, self._header = self._header, b''
+        return header + self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        header, self._header = self._header, b''
+        return header + self._compressor.flush()
+
+
+def _check(codec: str):
+    """Get module of codec, imported on first use so optional codecs are not loaded with fileio_wrapper"""
+    if codec not in SUFFIXES:
+        raise ValueError('Unknown codec {!r}, choose one of {}'.format(codec, ', '.join(SUFFIXES)))
+    if codec == 'gzip':
+        return zlib
+    try:
+        if codec == 'zstd':
+            import zstandard
+            return zstandard
+        import lz4.frame
+        return lz4.frame
+    except ImportError:
+        raise ImportError('{0} codec requires {1}, install with `pip install fileio-wrapper[{0}]`'.format(
+            codec, 'zstandard' if codec == 'zstd' else codec)) from None
+
+
+def _compressor(codec: str, level: Optional[int]):
+    module = _check(codec)
+    if codec == 'gzip':
+        return zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+    if codec == 'zstd':
+        return module.ZstdCompressor(level=3 if level is None else level).compressobj()
+    return _Lz4Compressor(level)
+
+
+def _decompressor(codec: str):
+    module = _check(codec)
+    if codec == 'gzip':
+        return zlib.decompressobj(31)
+    if codec == 'zstd':
+        return module.ZstdDecompressor().decompressobj()
+    return _Lz4Decompressor()
+
+
+def compress(chunks: Iterable[bytes], codec: str, level: int = None) -> Iterator[bytes]:
+    """Compress a stream of chunks, skipping empty output so no empty chunk ends chunked transfer encoding early"""
+    compressor = _compressor(codec, level)
+    for chunk in chunks:
+        chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+    chunk = compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def decompress(chunks: Iterable[bytes], codec: str) -> Iterator[bytes]:
+    """Decompress a stream of chunks"""
+    decompressor = _decompressor(codec)
+    for chunk in chunks:
+        chunk = decompressor.decompress(chunk)
+        if chunk:
+            yield chunk
+    chunk = decompressor.flush()
+    if chunk:
+        yield chunk
+
+
+def codec_of(filename: str) -> Optional[str]:
+    """Get codec a file was compressed with on upload from its filename, None if not compressed"""
+    for codec, suffix in SUFFIXES.items():
+        if filename.endswith(suffix):
+            return codec
+    return None
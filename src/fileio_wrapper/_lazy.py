@@ -0,0 +1,22 @@
+import importlib
+
+
+class _LazyModule(object):
+    """Stand-in of a module that is imported on first attribute access
+
+    Lets a module refer to a heavy dependency as usual, e.g. `except requests.RequestException`,
+    while paying its import cost only once it is really used
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        # Only called for attributes not found on the stand-in itself
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        return '<lazy module {!r}>'.format(self._name)
@@ -0,0 +1,36 @@
+import threading
+import time
+
+
+class _TokenBucket(object):
+    """Thread-safe token bucket limiting calls per second
+
+    Each acquire() reserves a token, so the lock is never held while sleeping and waiting callers are served in order
+    Rate None means no limit, but bucket can still be paused, e.g. when server answers 429 Too Many Requests
+    """
+
+    def __init__(self, rate: float = None, burst: int = None) -> None:
+        self.rate = rate
+        self.capacity = burst if burst else max(1, int(rate or 1))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.rate:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for seconds from now"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
@@ -0,0 +1,78 @@
+import contextlib
+import threading
+from typing import Callable, Hashable, Iterator
+
+
+class _Call(object):
+    __slots__ = ('done', 'result', 'error', 'shared', 'shared_error', 'callers')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = None
+        self.shared_error = None
+        self.callers = 1
+
+
+class _SingleFlight(object):
+    """Merge concurrent calls with the same key into one call whose result is handed to every caller
+
+    First caller of a key runs the function, callers arriving while it is in flight wait for its result or exception.
+    A call is forgotten as soon as it completes, so results are never cached, callers after it run a new call.
+    """
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def share(self, key: Hashable, func: Callable[[], object], close: Callable[[object], None] = None,
+              handoff: Callable[[object], object] = None) -> Iterator:
+        """Run func, or wait for the call of key in flight, and yield its result
+
+        Args:
+            key: Identity of the call, calls with equal keys are merged
+            func: Function to run without arguments
+            close: Called with the result handed to callers once the last caller sharing it leaves the with block
+            handoff: Called with result of func only if other callers are waiting for it, and its return value
+                is yielded to them instead, e.g. to make a copy of a result the first caller consumes.
+                First caller always gets result of func, and exception of handoff is raised to the others only
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.callers += 1
+        if leader:
+            try:
+                call.result = func()
+            except BaseException as e:
+                call.error = e
+            finally:
+                # No caller joins after this, so callers is final before any caller leaves
+                with self._lock:
+                    del self._calls[key]
+                    followers = call.callers > 1
+                call.shared, call.shared_error = call.result, call.error
+                if followers and handoff is not None and call.error is None:
+                    try:
+                        call.shared = handoff(call.result)
+                    except BaseException as e:
+                        call.shared_error = e
+                call.done.set()
+        else:
+            call.done.wait()
+        error, result = (call.error, call.result) if leader else (call.shared_error, call.shared)
+        try:
+            if error is not None:
+                raise error
+            yield result
+        finally:
+            with self._lock:
+                call.callers -= 1
+                last = not call.callers
+            if last and close is not None and call.shared_error is None:
+                close(call.shared)
@@ -0,0 +1,403 @@
+import io
+import mmap
+import os
+import stat
+import threading
+from typing import AsyncIterator, Callable, Iterable, Iterator, Optional
+from ._lazy import _LazyModule
+
+tempfile = _LazyModule('tempfile')
+
+
+class _IterStream(io.RawIOBase):
+    """Read-only file-like view of an iterable of bytes chunks
+
+    Chunks are handed out through memoryview slices, so reading never copies more than the caller asks for
+    """
+
+    def __init__(self, iterable: Iterable[bytes]) -> None:
+        self._iter = iter(iterable)
+        self._buf = memoryview(b'')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            try:
+                self._buf = memoryview(next(self._iter))
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+    def close(self) -> None:
+        if hasattr(self._iter, 'close'):
+            self._iter.close()
+        super().close()
+
+
+class _Pipe(object):
+    """Bounded ring buffer of bytes between a producer thread and a consumer thread
+
+    Writer blocks while buffer is full and reader blocks while it is empty, so producer never runs ahead of consumer
+    by more than capacity bytes. An exception passed to abort() is raised on the other side.
+    """
+
+    def __init__(self, capacity: int = 1024 * 1024) -> None:
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+
+    def write(self, data) -> int:
+        """Copy data into buffer, blocking until there is room for all of it"""
+        view = memoryview(data).cast('B')
+        with self._cond:
+            while view:
+                while self._size == self.capacity and self._error is None:
+                    self._cond.wait()
+                if self._error is not None:
+                    raise self._error
+                if self._closed:
+                    raise ValueError('write to closed pipe')
+                end = (self._start + self._size) % self.capacity
+                n = min(len(view), self.capacity - self._size, self.capacity - end)
+                self._buf[end:end + n] = view[:n]
+                self._size += n
+                view = view[n:]
+                self._cond.notify_all()
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        """Take at most size bytes out of buffer, blocking until there is any. Empty bytes on end of stream"""
+        with self._cond:
+            while self._size == 0 and not self._closed and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                raise self._error
+            n = self._size if size < 0 else min(size, self._size)
+            first = min(n, self.capacity - self._start)
+            data = bytes(self._buf[self._start:self._start + first]) + bytes(self._buf[:n - first])
+            self._start = (self._start + n) % self.capacity
+            self._size -= n
+            self._cond.notify_all()
+            return data
+
+    def close(self) -> None:
+        """Mark end of stream, reader gets the rest of buffer and then empty bytes"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def abort(self, error: BaseException) -> None:
+        """Fail both sides with error, unless already failed"""
+        with self._cond:
+            if self._error is None:
+                self._error = error
+            self._cond.notify_all()
+
+    def iter(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        chunk = self.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = self.read(chunk_size)
+
+
+class _Spool(object):
+    """Temporary file holding a body read by several callers, in memory until it grows over max_size
+
+    Every iteration of chunks() keeps its own offset, so callers can read it concurrently
+    """
+
+    def __init__(self, max_size: int = 8 * 1024 * 1024) -> None:
+        self._file = tempfile.SpooledTemporaryFile(max_size)
+        self._lock = threading.Lock()
+
+    def write(self, data) -> int:
+        return self._file.write(data)
+
+    def chunks(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        offset = 0
+        while True:
+            with self._lock:
+                self._file.seek(offset)
+                chunk = self._file.read(chunk_size)
+            if not chunk:
+                return
+            offset += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _pipe_from(writer: Callable[[_Pipe], None], capacity: int = 1024 * 1024,
+               chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Iterate over bytes a writer function writes into a _Pipe on a worker thread
+
+    Work done by the writer, e.g. reading, compressing or archiving, overlaps with work done by the consumer,
+    e.g. sending. Exception of the writer is raised to the consumer, and the writer fails on its next write
+    once the consumer stops iterating.
+    """
+    pipe = _Pipe(capacity)
+
+    def produce():
+        try:
+            writer(pipe)
+            pipe.close()
+        except BaseException as e:
+            pipe.abort(e)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        for chunk in pipe.iter(chunk_size):
+            yield chunk
+    finally:
+        pipe.abort(BrokenPipeError('Reader of pipe stopped'))
+
+
+def _piped(chunks: Iterable[bytes], capacity: int = 1024 * 1024, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Iterate over chunks on a worker thread, handed over through a _Pipe"""
+    def write(pipe):
+        for chunk in chunks:
+            pipe.write(chunk)
+    return _pipe_from(write, capacity, chunk_size)
+
+
+def _buffer(source) -> Optional[memoryview]:
+    """Get a flat byte view of a bytes-like source, e.g. bytes, bytearray, memoryview or mmap, None for other sources"""
+    if isinstance(source, memoryview):
+        return source.cast('B') if source.format != 'B' or source.ndim != 1 else source
+    if isinstance(source, (bytes, bytearray, mmap.mmap)):
+        return memoryview(source)
+    return None
+
+
+def _slices(view: memoryview, chunk_size: int) -> Iterator[memoryview]:
+    """Iterate over a view in slices of chunk_size, without copying"""
+    for offset in range(0, len(view), chunk_size):
+        yield view[offset:offset + chunk_size]
+
+
+def _map_file(f, threshold: Optional[int]):
+    """Map a regular file opened for reading into memory if it has at least threshold bytes
+
+    Body is then sent in slices of the mapping, straight from page cache, instead of being copied into a new bytes
+    object by every read. Return memoryview of the mapping, or f itself if it is not mapped
+    """
+    if threshold is None:
+        return f
+    try:
+        size = os.fstat(f.fileno()).st_size
+        if not size or size < threshold or f.tell():
+            return f
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return f
+
+
+def _unmap(source) -> None:
+    """Close mapping made by _map_file, or leave it to garbage collector while a slice of it is still referenced"""
+    if isinstance(source, memoryview) and isinstance(source.obj, mmap.mmap):
+        mapping = source.obj
+        try:
+            source.release()
+            mapping.close()
+        except BufferError:
+            pass
+
+
+def _check_source(source) -> None:
+    """Raise TypeError if source is not one _MultipartStream can read, so it fails before anything is sent"""
+    if not any(hasattr(source, attr) for attr in ('read', '__iter__', '__aiter__')):
+        raise TypeError('Can not upload {!r}, expected a path, bytes-like object, file object or iterable of bytes'
+                        .format(type(source).__name__))
+
+
+def _read_chunks(source, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Iterate over a source as accepted by _MultipartStream: bytes-like object, str, file-like object or
+    iterable of bytes"""
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+    view = _buffer(source)
+    if view is not None:
+        yield from _slices(view, chunk_size)
+    elif hasattr(source, 'read'):
+        chunk = source.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = source.read(chunk_size)
+    else:
+        for chunk in source:
+            yield chunk
+
+
+def _guess_filename(obj, default: str = 'file') -> str:
+    """Guess filename from name attribute of file object, same as requests does"""
+    name = getattr(obj, 'name', None)
+    if isinstance(name, str) and name and not (name.startswith('<') and name.endswith('>')):
+        return os.path.basename(name)
+    return default
+
+
+def _source_size(source) -> Optional[int]:
+    """Get remaining bytes count of a file-like source, or None if it can not be known (e.g. pipe)"""
+    try:
+        st = os.fstat(source.fileno())
+        if stat.S_ISREG(st.st_mode):
+            return st.st_size - source.tell()
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    try:
+        if source.seekable():
+            position = source.tell()
+            end = source.seek(0, os.SEEK_END)
+            source.seek(position)
+            return end - position
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    return None
+
+
+def _source_position(source) -> Optional[int]:
+    """Get position to rewind a source to, 0 for bytes-like sources, or None if source can not be read again"""
+    if isinstance(source, memoryview):
+        return 0
+    try:
+        if source.seekable():
+            return source.tell()
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    return None
+
+
+# Escapes of quoted header parameters, same as the HTML5 multipart formatter of urllib3, so CR/LF can not
+# start a new header or break the body framing
+_PARAM_ESCAPES = {code: '%{:02X}'.format(code) for code in range(0x20) if code != 0x1B}
+_PARAM_ESCAPES[ord('"')] = '%22'
+
+
+class _MultipartStream(object):
+    """Incrementally encoded multipart/form-data body
+
+    Takes a files dict in the same format as requests files= parameter, but never builds the whole body in memory.
+    Plain fields ([None, value] lists) are sent first, then file parts are read chunk by chunk from their source.
+    A file part is a (filename, source[, size]) tuple or a file object, where source is a bytes-like object, str,
+    a file-like object or an iterable of bytes. Async iterables of bytes are accepted when iterated with aiter().
+    Bytes-like sources, e.g. bytearray, memoryview or mmap, are sent in memoryview slices without being copied.
+
+    Attribute len is only set if size of every part is known, so requests sends Content-Length.
+    Otherwise requests sends the body with chunked transfer encoding.
+    Attribute callback, if assigned, is called with bytes count of every chunk handed to the transport.
+    """
+
+    def __init__(self, files: dict, chunk_size: int = 64 * 1024) -> None:
+        self.boundary = os.urandom(16).hex()
+        self.content_type = 'multipart/form-data; boundary={}'.format(self.boundary)
+        self.chunk_size = chunk_size
+        self.callback = None
+
+        fields, uploads = [], []
+        for name, value in files.items():
+            if isinstance(value, list) and value[0] is None:
+                data = value[1].encode('utf-8') if isinstance(value[1], str) else value[1]
+                fields.append((self.__header(name), memoryview(data), len(data)))
+                continue
+            if isinstance(value, tuple):
+                filename, source = value[0], value[1]
+                size = value[2] if len(value) > 2 else None
+            else:
+                filename, source, size = _guess_filename(value, name), value, None
+            if isinstance(source, str):
+                source = source.encode('utf-8')
+            view = _buffer(source)
+            if view is not None:
+                source, size = view, len(view)
+            elif size is None and hasattr(source, 'read'):
+                size = _source_size(source)
+            else:
+                _check_source(source)
+            uploads.append((self.__header(name, filename), source, size))
+        self._parts = fields + uploads
+        self._positions = [_source_position(source) for _, source, _ in self._parts]
+        self._tail = '--{}--\r\n'.format(self.boundary).encode('utf-8')
+
+        if all(size is not None for _, _, size in self._parts):
+            self.len = sum(len(header) + size + 2 for header, _, size in self._parts) + len(self._tail)
+
+    @property
+    def rewindable(self) -> bool:
+        """Whether body can be sent again, i.e. every source is bytes or a seekable file-like object"""
+        return all(position is not None for position in self._positions)
+
+    def rewind(self) -> None:
+        """Seek every file-like source back to its position when the body was created, so body can be resent"""
+        for (_, source, _), position in zip(self._parts, self._positions):
+            if hasattr(source, 'seek'):
+                source.seek(position)
+
+    def __header(self, name: str, filename: str = None) -> bytes:
+        disposition = 'form-data; name="{}"'.format(name.translate(_PARAM_ESCAPES))
+        header = '--{}\r\n'.format(self.boundary)
+        if filename is None:
+            header += 'Content-Disposition: {}\r\n\r\n'.format(disposition)
+        else:
+            header += 'Content-Disposition: {}; filename="{}"\r\n'.format(disposition,
+                                                                           filename.translate(_PARAM_ESCAPES))
+            header += 'Content-Type: application/octet-stream\r\n\r\n'
+        return header.encode('utf-8')
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self.callback is None:
+            return self.__chunks()
+        return self.__counted(self.__chunks())
+
+    def __counted(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.callback(len(chunk))
+            yield chunk
+
+    def __chunks(self) -> Iterator[bytes]:
+        for header, source, _ in self._parts:
+            yield header
+            if isinstance(source, memoryview):
+                yield from _slices(source, self.chunk_size)
+            elif hasattr(source, 'read'):
+                chunk = source.read(self.chunk_size)
+                while chunk:
+                    yield chunk
+                    chunk = source.read(self.chunk_size)
+            else:
+                for chunk in source:
+                    yield chunk
+            yield b'\r\n'
+        yield self._tail
+
+    async def aiter(self) -> AsyncIterator[bytes]:
+        """Async version of iteration, file-like sources are read in executor so event loop is never blocked"""
+        import asyncio
+        loop = asyncio.get_event_loop()
+        for header, source, _ in self._parts:
+            yield header
+            if isinstance(source, memoryview):
+                for chunk in _slices(source, self.chunk_size):
+                    yield chunk
+            elif hasattr(source, 'read'):
+                chunk = await loop.run_in_executor(None, source.read, self.chunk_size)
+                while chunk:
+                    yield chunk
+                    chunk = await loop.run_in_executor(None, source.read, self.chunk_size)
+            elif hasattr(source, '__aiter__'):
+                async for chunk in source:
+                    yield chunk
+            else:
+                for chunk in source:
+                    yield chunk
+            yield b'\r\n'
+        yield self._tail
@@ -0,0 +1,110 @@
+import socket
+import threading
+import time
+
+# Seconds spent on opening connections by current thread, reset before each request
+# 'connect' is the whole of it, 'dns' and 'tls' the parts spent on name resolution and TLS handshake
+_timing = threading.local()
+
+
+def _reset_connect_time() -> None:
+    _timing.connect = _timing.dns = _timing.tls = 0.0
+
+
+def _connect_time(phase: str = 'connect') -> float:
+    return getattr(_timing, phase, 0.0)
+
+
+def _add_time(phase: str, started: float) -> float:
+    elapsed = time.perf_counter() - started
+    setattr(_timing, phase, _connect_time(phase) + elapsed)
+    return elapsed
+
+
+_adapter_class = None
+_adapter_lock = threading.Lock()
+
+
+def _timed_adapter(**kwargs):
+    """Create an HTTPAdapter whose connections record how long connecting took, read it with _connect_time()
+
+    Connections resolve the host name themselves before handing each address to urllib3,
+    so name resolution, TCP connect and TLS handshake are timed apart
+
+    requests and urllib3 are imported, and the adapter classes defined, on first call only,
+    so importing fileio_wrapper stays cheap until the first request is sent
+    """
+    global _adapter_class
+    if _adapter_class is None:
+        with _adapter_lock:
+            if _adapter_class is None:
+                _adapter_class = _define_adapter_class()
+    return _adapter_class(**kwargs)
+
+
+def _define_adapter_class():
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.exceptions import NewConnectionError, ConnectTimeoutError
+    from urllib3.util.connection import allowed_gai_family
+
+    class _TimedConnection(object):
+        def connect(self) -> None:
+            started = time.perf_counter()
+            self._opening = 0.0
+            try:
+                super().connect()
+            finally:
+                elapsed = _add_time('connect', started)
+                if isinstance(self, HTTPSConnection):
+                    # Anything after the socket is open is TLS handshake, or proxy tunnel set up before it
+                    _timing.tls = _connect_time('tls') + max(0.0, elapsed - self._opening)
+
+        def _new_conn(self):
+            # Resolve name here, so its time is told apart from TCP connect, then connect to addresses in order
+            opening = time.perf_counter()
+            host = self._dns_host
+            try:
+                infos = socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM)
+                addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            except (OSError, UnicodeError):
+                addresses = None
+            _add_time('dns', opening)
+            try:
+                if not addresses:
+                    # Let urllib3 resolve name again and raise its own error
+                    return super()._new_conn()
+                for index, address in enumerate(addresses):
+                    self._dns_host = address
+                    try:
+                        return super()._new_conn()
+                    except (NewConnectionError, ConnectTimeoutError):
+                        if index == len(addresses) - 1:
+                            raise
+                    finally:
+                        self._dns_host = host
+            finally:
+                self._opening = time.perf_counter() - opening
+
+    class _TimedHTTPConnection(_TimedConnection, HTTPConnection):
+        pass
+
+    class _TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+        pass
+
+    class _TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _TimedHTTPConnection
+
+    class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _TimedHTTPSConnection
+
+    class _TimedHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs) -> None:
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                'http': _TimedHTTPConnectionPool,
+                'https': _TimedHTTPSConnectionPool,
+            }
+
+    return _TimedHTTPAdapter
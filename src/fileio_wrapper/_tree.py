@@ -0,0 +1,57 @@
+import heapq
+import os
+from typing import List, Tuple
+from ._lazy import _LazyModule
+
+tarfile = _LazyModule('tarfile')
+
+
+def _walk(root: str) -> List[Tuple[str, str, int]]:
+    """List regular files and symlinks under root as (relative path with '/' separators, path, size), sorted"""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            relpath = os.path.relpath(path, root).replace(os.sep, '/')
+            files.append((relpath, path, os.lstat(path).st_size))
+    return files
+
+
+def _balance(files: List[Tuple[str, str, int]], shards: int) -> List[List[Tuple[str, str, int]]]:
+    """Split files into at most shards groups of about the same total size, largest file first to the lightest group"""
+    heap = [(0, index, []) for index in range(max(1, min(shards, len(files))))]
+    for file in sorted(files, key=lambda file: -file[2]):
+        total, index, group = heapq.heappop(heap)
+        group.append(file)
+        heapq.heappush(heap, (total + file[2], index, group))
+    return [sorted(group) for _, _, group in sorted(heap, key=lambda item: item[1])]
+
+
+def _write_tar(fileobj, files: List[Tuple[str, str, int]]) -> None:
+    """Write files into fileobj as an uncompressed tar stream, without seeking"""
+    with tarfile.open(fileobj=fileobj, mode='w|') as tar:
+        for relpath, path, _ in files:
+            tar.add(path, arcname=relpath, recursive=False)
+
+
+def _extract_tar(fileobj, dest: str) -> List[str]:
+    """Extract a tar stream into dest without seeking, refusing members that would land outside of dest
+
+    Return:
+        Names of extracted members
+    """
+    dest = os.path.abspath(dest)
+    kwargs = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+    names = []
+    with tarfile.open(fileobj=fileobj, mode='r|*') as tar:
+        for member in tar:
+            target = os.path.abspath(os.path.join(dest, member.name))
+            if os.path.commonpath([dest, target]) != dest:
+                raise tarfile.TarError('Refuse to extract {!r} outside of {}'.format(member.name, dest))
+            if not kwargs and (member.issym() or member.islnk() or member.isdev()):
+                # Python without extraction filters could follow links outside of dest
+                raise tarfile.TarError('Refuse to extract link or device {!r}'.format(member.name))
+            tar.extract(member, dest, **kwargs)
+            names.append(member.name)
+    return names
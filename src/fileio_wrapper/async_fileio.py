@@ -0,0 +1,321 @@
+import asyncio
+import contextlib
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Union, Literal, AsyncIterator, AsyncIterable, Iterable, BinaryIO
+from .results import UploadResult, ListResult, AccountInfo, DownloadResult
+from ._streams import _MultipartStream, _guess_filename
+from .fileio_wrapper import Fileio, FileioError, class_or_instancemethod, _format_queries, _format_files, \
+    _temp_path
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncFileio(object):
+    url = Fileio.url
+    headers = {'accept': 'application/json'}
+    pool_size = 100
+    concurrency = 100
+    chunk_size = Fileio.chunk_size
+    _session = None
+    _semaphore = None
+    _loop = None
+
+    def __init__(self, api_key: str, pool_size: int = 100, concurrency: int = 100) -> None:
+        """Constructor of AsyncFileio Class
+
+        asyncio version of Fileio, every method is a coroutine with the same parameters and results as Fileio
+        Auth needed method have to be called by AsyncFileio instance
+        Non-auth needed method can be called by AsyncFileio class directly
+        aiohttp is needed, install with `pip install fileio-wrapper[async]`
+
+        Example:
+            async with AsyncFileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX') as fileio:
+                results = await asyncio.gather(*(fileio.upload(path) for path in paths))
+
+        Args:
+            api_key: API Key of file.io account
+                You can get API Key of account at https://www.file.io/account/apikeys
+            pool_size: Max number of connections kept open to file.io
+            concurrency: Max number of requests in flight at the same time. Other requests wait for a free slot.
+        """
+        self.api_key = api_key
+        self.headers = {
+            'accept': 'application/json',
+            'Authorization': 'Bearer {}'.format(self.api_key),
+        }
+        self.pool_size = pool_size
+        self.concurrency = concurrency
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @class_or_instancemethod
+    def __get_session(self) -> 'aiohttp.ClientSession':
+        """Get the pooled session of class or instance
+
+        A private method that lazily creates the aiohttp.ClientSession shared by every call of the class or instance
+        Session is bound to the running event loop, it is recreated if the loop it was created in is closed
+
+        Return:
+            aiohttp.ClientSession of the class or instance
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncFileio requires aiohttp, install with `pip install fileio-wrapper[async]`')
+        # Look up own __dict__ only, subclass or instance should not borrow session of AsyncFileio class
+        session = self.__dict__.get('_session')
+        if session is None or session.closed or self._loop.is_closed():
+            session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+            self._session = session
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = asyncio.get_running_loop()
+        return session
+
+    @class_or_instancemethod
+    async def close(self) -> None:
+        """Close pooled connections
+
+        Close connections of class or instance. Session will be recreated on next call.
+        Instance can also be used as async context manager to close connections automatically.
+        """
+        session = self.__dict__.get('_session')
+        if session is not None:
+            self._session = None
+            if not session.closed and not self._loop.is_closed():
+                await session.close()
+
+    @class_or_instancemethod
+    async def __do_request(self, method: str, path: str = '', queries: dict = {}, headers: dict = {},
+                           files: dict = {}) -> dict:
+        """Make a request to file.io
+
+        A private method that formatting request and result, same as Fileio.__do_request
+
+        Args:
+            method: Request method name to apply [GET, POST, PUT, PATCH, DELETE]
+            queries: Dict of query data.
+            headers: Dict of header data. No need in general case.
+            files: Dict of files data. Encoded as a streaming multipart body, see _MultipartStream
+
+        Return:
+            Dict loads from result json
+            Should always have following Keys: 'success', 'status', 'key'
+        """
+        queries = _format_queries(queries)
+        headers = dict(headers if headers else self.headers)
+        files = _format_files(files)
+        key = None if path == 'me' else path
+
+        data = None
+        if files:
+            stream = _MultipartStream(files, self.chunk_size)
+            headers['Content-Type'] = stream.content_type
+            if hasattr(stream, 'len'):
+                headers['Content-Length'] = str(stream.len)
+            data = stream.aiter()
+
+        session = self.__get_session()
+        status = 503
+        try:
+            async with self._semaphore:
+                async with session.request(method, self.url + path + queries, headers=headers, data=data) as resp:
+                    status = resp.status
+                    text = await resp.text()
+            return json.loads(
+                text if text else '{{"success": true, "status": {}, "key": {} }}'.format(
+                    status, '"{}"'.format(key) if key else 'null'))
+        except ValueError:
+            return {
+                'success': False,
+                'status': 0,
+                'code': 'RESULT _ERROR',
+                'message': 'Result is not JSON',
+                'key': key
+            }
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+            return {
+                'success': False,
+                'status': status,
+                'code': 'SERVICE_UNAVAILABLE',
+                'message': 'Not able to connect to file.io server',
+                'key': key
+            }
+
+    @class_or_instancemethod
+    async def upload(self, file: Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, Iterable[bytes],
+                                       AsyncIterable[bytes]],
+                     expires: Union[str, datetime, timedelta] = '__default', max_downloads: int = '__default',
+                     auto_delete: bool = '__default', filename: str = None, size: int = None) -> UploadResult:
+        """Uploads files and creates file details
+
+        Same as Fileio.upload, file can also be an async iterable of bytes
+
+        Example:
+            result = await AsyncFileio.upload('myfile.txt')  # upload without auth
+            result = await fileio.upload(response.content.iter_chunked(65536), filename='copy.bin')
+
+        Return:
+            UploadResult of file details
+            Should always have following Keys: 'success', 'status', 'key'
+        """
+        f = open(os.fspath(file), 'rb') if isinstance(file, (str, os.PathLike)) else None
+        try:
+            files = {
+                'file': (filename or _guess_filename(f or file), f or file, size),
+                'expires': [None, expires],
+                'maxDownloads': [None, max_downloads],
+                'autoDelete': [None, auto_delete],
+            }
+            return UploadResult(await self.__do_request('POST', files=files))
+        finally:
+            if f:
+                f.close()
+
+    async def list(self, search: str = None, sort: str = None, offset: int = None, limit: int = None) -> ListResult:
+        """Get list of files for authorized user, same as Fileio.list"""
+        queries = {
+            'search': search,
+            'sort': sort,
+            'offset': offset,
+            'limit': limit,
+        }
+        return ListResult(await self.__do_request('GET', queries=queries))
+
+    async def me(self) -> AccountInfo:
+        """Get plan/account details for authorized user, same as Fileio.me"""
+        return AccountInfo(await self.__do_request('GET', path='me'))
+
+    @class_or_instancemethod
+    async def iter_download(self, key: str, chunk_size: int = None) -> AsyncIterator[bytes]:
+        """Iterate over content of the file identified by key
+
+        Async version of Fileio.iter_download. Request is sent on first iteration.
+        The concurrency slot is held until iteration is finished.
+
+        Example:
+            async for chunk in AsyncFileio.iter_download('ZDu1og7rOkJq'):
+                await sink.write(chunk)
+
+        Raise:
+            FileioError: if file.io can not be reached or the file is not available
+        """
+        headers = dict(self.headers)
+        headers['accept'] = '*/*'
+        session = self.__get_session()
+        error = {
+            'success': False,
+            'status': 503,
+            'code': 'SERVICE_UNAVAILABLE',
+            'message': 'Not able to connect to file.io server',
+            'key': key
+        }
+        async with self._semaphore:
+            try:
+                async with session.get(self.url + key, headers=headers) as resp:
+                    error['status'] = resp.status
+                    if not re.search('filename=([^;]+);?', resp.headers.get('content-disposition', '')):
+                        raise FileioError(error)
+                    async for chunk in resp.content.iter_chunked(chunk_size or self.chunk_size):
+                        yield chunk
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                raise FileioError(error) from e
+
+    @class_or_instancemethod
+    async def download(self, key: str, filepath: str = None, chunk_size: int = None) -> DownloadResult:
+        """Dlownloads the file identified by key
+
+        Same as Fileio.download. File is streamed to a temp file next to filepath chunk by chunk, writes are done in
+        executor, and renamed once complete, so a broken download never leaves a truncated file at filepath.
+
+        Example:
+            ret_json = await AsyncFileio.download('ZDu1og7rOkJq')  # Get raw data in key 'content'
+            ret_json = await fileio.download('ZDu1og7rOkJq', 'content/')  # Save to file with original filename
+
+        Return:
+            DownloadResult, same as Fileio.download
+            Return raw byte-type data if filepath parameter didn't assigned
+            Return download result if filepath parameter assigned and download file to the filepath
+        """
+        headers = dict(self.headers)
+        headers['accept'] = '*/*'
+        session = self.__get_session()
+        loop = asyncio.get_event_loop()
+        status = 503
+        try:
+            async with self._semaphore:
+                async with session.get(self.url + key, headers=headers) as resp:
+                    status = resp.status
+                    filename = re.search('filename=([^;]+);?', resp.headers['content-disposition']).group(1)
+                    if not filepath:
+                        return DownloadResult({
+                            'success': True,
+                            'status': status,
+                            'key': key,
+                            'content': await resp.read()
+                        })
+                    filename = os.path.join(os.path.dirname(filepath), filename) if os.path.isdir(filepath) else filepath
+                    temp = _temp_path(filename)
+                    try:
+                        with open(temp, 'wb') as f:
+                            async for chunk in resp.content.iter_chunked(chunk_size or self.chunk_size):
+                                await loop.run_in_executor(None, f.write, chunk)
+                        os.replace(temp, filename)
+                    except BaseException:
+                        with contextlib.suppress(OSError):
+                            os.remove(temp)
+                        raise
+                    return DownloadResult({
+                        'success': True,
+                        'status': status,
+                        'key': key,
+                        'path': os.path.dirname(os.path.abspath(filename)),
+                        'name': os.path.basename(filename),
+                    })
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError, KeyError, AttributeError):
+            return DownloadResult({
+                'success': False,
+                'status': status,
+                'code': 'SERVICE_UNAVAILABLE',
+                'message': 'Not able to connect to file.io server',
+                'key': key
+            })
+
+    async def delete(self, key: str) -> dict:
+        """Deletes the file identified by key for authorized user, same as Fileio.delete"""
+        return await self.__do_request('DELETE', path=key)
+
+    async def update(self, key: str, file: Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO,
+                                                 Iterable[bytes], AsyncIterable[bytes]] = '__default',
+                     expires: Union[str, datetime, timedelta] = '__default',
+                     max_downloads: int = '__default', auto_delete: bool = '__default',
+                     mode: Literal['replace_all', 'replace_partial'] = 'replace_partial', filename: str = None,
+                     size: int = None) -> UploadResult:
+        """Updates the file identified by key for authorized user, same as Fileio.update"""
+        if mode not in ('replace_all', 'replace_partial'):
+            raise ValueError
+        f = open(os.fspath(file), 'rb') if isinstance(file, (str, os.PathLike)) and file != '__default' else None
+        try:
+            files = {
+                'file': file if file == '__default' else (filename or _guess_filename(f or file), f or file, size),
+                'expires': [None, expires],
+                'maxDownloads': [None, max_downloads],
+                'autoDelete': [None, auto_delete],
+            }
+            if mode == 'replace_all':
+                return UploadResult(await self.__do_request('PUT', path=key, files=files))
+            else:
+                return UploadResult(await self.__do_request('PATCH', path=key, files=files))
+        finally:
+            if f:
+                f.close()
@@ -0,0 +1,195 @@
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class MetadataCache(object):
+    def __init__(self, ttl: float = 60, maxsize: int = 256, path: str = None) -> None:
+        """Constructor of MetadataCache Class
+
+        In-process LRU cache with TTL for results of list and me
+        Results are keyed by kind, account and parameters, e.g. ('list', account, search, sort, offset, limit),
+        so instances of different accounts can share a cache
+        Fileio keeps the cache consistent: upload, update, delete and download patch or invalidate affected entries
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX', cache=MetadataCache(ttl=30))
+            fileio.me()  # request file.io
+            fileio.me()  # served from cache
+
+        Args:
+            ttl: Seconds a result is served from cache
+            maxsize: Max number of results kept in memory, least recently used result is dropped first
+            path: SQLite file to persist results in, so they survive process restart. None to keep in memory only
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)')
+            self._db.execute('DELETE FROM cache WHERE expires < ?', (time.time(),))
+            self._db.commit()
+
+    def get(self, key: tuple) -> Optional[dict]:
+        """Get a copy of cached result, None if not cached or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db:
+                row = self._db.execute('SELECT value, expires FROM cache WHERE key = ?', (json.dumps(key),)).fetchone()
+                if row:
+                    entry = self.__store(key, json.loads(row[0]), row[1])
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                self.__drop([key])
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[0])
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every invalidate, patch_node and remove_node"""
+        return self._generation
+
+    def set(self, key: tuple, value: dict, generation: int = None) -> None:
+        """Cache a copy of result for ttl seconds
+
+        Args:
+            key: Key of result
+            value: Result dict
+            generation: generation read before result was requested. Result is not cached if cache was
+                invalidated or patched since, as it may not reflect that change
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            expires = time.time() + self.ttl
+            self.__store(key, copy.deepcopy(value), expires)
+            if self._db:
+                self._db.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                                 (json.dumps(key), json.dumps(value), expires))
+                self._db.commit()
+
+    def invalidate(self, kind: str = None, file_key: str = None) -> None:
+        """Drop cached results
+
+        Args:
+            kind: Drop results of 'list' or 'me' only, of every account. Drop every result if not assigned
+            file_key: Drop only list results containing the file with the key
+        """
+        with self._lock:
+            self._generation += 1
+            self.__load_all()
+            self.__drop([key for key, (value, _) in self._entries.items()
+                         if (kind is None or key[0] == kind)
+                         and (file_key is None or self.__find_node(value, file_key) is not None)])
+            self.__trim()
+
+    def patch_node(self, file_key: str, fields: dict) -> None:
+        """Update file details of a file in cached list results in place
+
+        List results sorted by a changed field are dropped since order of items may change
+
+        Args:
+            file_key: Key of file
+            fields: New file details, e.g. result of update. Only fields that a node already has are patched
+        """
+        with self._lock:
+            self._generation += 1
+            self.__load_all()
+            drop = []
+            for key, (value, _) in self._entries.items():
+                node = self.__find_node(value, file_key)
+                if node is None:
+                    continue
+                changed = {field: fields[field] for field in node if field in fields and node[field] != fields[field]}
+                sort = key[3] if key[0] == 'list' else None
+                if sort and sort.lstrip('-') in changed:
+                    drop.append(key)
+                    continue
+                node.update(changed)
+                self.__persist(key, value)
+            self.__drop(drop)
+            self.__trim()
+
+    def remove_node(self, file_key: str) -> None:
+        """Remove a deleted file from cached list results
+
+        Unpaginated results are patched in place. Paginated results are dropped, since items after the file shift.
+        """
+        with self._lock:
+            self._generation += 1
+            self.__load_all()
+            drop = []
+            for key, (value, _) in self._entries.items():
+                if key[0] != 'list':
+                    continue
+                if key[4] is not None or key[5] is not None:
+                    drop.append(key)
+                    continue
+                node = self.__find_node(value, file_key)
+                if node is not None:
+                    value['nodes'].remove(node)
+                    if isinstance(value.get('count'), int):
+                        value['count'] -= 1
+                    self.__persist(key, value)
+            self.__drop(drop)
+            self.__trim()
+
+    def clear(self) -> None:
+        """Drop every cached result"""
+        self.invalidate()
+
+    def close(self) -> None:
+        """Close SQLite file"""
+        if self._db:
+            self._db.close()
+            self._db = None
+
+    @staticmethod
+    def __find_node(value: dict, file_key: str) -> Optional[dict]:
+        for node in value.get('nodes') or []:
+            if node.get('key') == file_key:
+                return node
+        return None
+
+    def __store(self, key: tuple, value: dict, expires: float) -> tuple:
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        self.__trim()
+        return self._entries[key]
+
+    def __trim(self) -> None:
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __load_all(self) -> None:
+        # Entries evicted from memory may still be persisted, load them back so they are patched too
+        if self._db:
+            for key, value, expires in self._db.execute('SELECT key, value, expires FROM cache').fetchall():
+                key = tuple(json.loads(key))
+                if key not in self._entries:
+                    self._entries[key] = (json.loads(value), expires)
+                    self._entries.move_to_end(key, last=False)
+
+    def __persist(self, key: tuple, value: dict) -> None:
+        if self._db:
+            self._db.execute('UPDATE cache SET value = ? WHERE key = ?', (json.dumps(value), json.dumps(key)))
+            self._db.commit()
+
+    def __drop(self, keys: list) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+            if self._db:
+                self._db.execute('DELETE FROM cache WHERE key = ?', (json.dumps(key),))
+        if self._db and keys:
+            self._db.commit()
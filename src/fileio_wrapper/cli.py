@@ -0,0 +1,199 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Iterator, List
+from .fileio_wrapper import Fileio, FileioError
+
+
+def _print(item: str, result: dict) -> bool:
+    """Print result as a JSON line tagged with its input, return whether it succeeded"""
+    print(json.dumps(dict(result, input=item), default=str), flush=True)
+    return bool(result.get('success'))
+
+
+def _items(args: argparse.Namespace, expand: bool = False) -> Iterator[str]:
+    """Iterate over items of positional arguments, then of --from-file, lazily so long lists stream"""
+    for item in args.items:
+        matches = sorted(glob.glob(item, recursive=True)) if expand else []
+        matches = [path for path in matches if os.path.isfile(path)]
+        yield from matches or [item]
+    if args.from_file:
+        f = sys.stdin if args.from_file == '-' else open(args.from_file)
+        try:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if line:
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def _client(args: argparse.Namespace):
+    """Fileio instance with api key, or a Fileio subclass for anonymous calls, sized for --jobs"""
+    if args.api_key:
+        client = Fileio(args.api_key, pool_size=args.jobs, rate_limit=args.rate_limit, max_workers=args.jobs)
+    else:
+        client = type('Fileio', (Fileio,), {
+            'pool_size': args.jobs,
+            'rate_limit': args.rate_limit,
+            'max_workers': args.jobs,
+        })
+    if args.url:
+        client.url = args.url.rstrip('/') + '/'
+    return client
+
+
+def _upload(client, args: argparse.Namespace) -> bool:
+    options = {
+        'expires': args.expires if args.expires is not None else '__default',
+        'max_downloads': args.max_downloads if args.max_downloads is not None else '__default',
+        'auto_delete': args.auto_delete if args.auto_delete is not None else '__default',
+    }
+    if args.items == ['-'] and not args.from_file:
+        return _print('-', client.upload(sys.stdin.buffer, filename=args.name or 'stdin', **options))
+    ok = True
+    for path, result in client.upload_many(_items(args, expand=True), max_workers=args.jobs, **options):
+        ok = _print(path, result) and ok
+    return ok
+
+
+def _download(client, args: argparse.Namespace) -> bool:
+    if args.output == '-':
+        keys = list(_items(args))
+        if len(keys) != 1:
+            raise SystemExit('fileio download: only one key can be written to stdout')
+        try:
+            for chunk in client.iter_download(keys[0]):
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        except FileioError as e:
+            print(json.dumps(dict(e.result, input=keys[0])), file=sys.stderr)
+            return False
+        return True
+    os.makedirs(args.output, exist_ok=True)
+    ok = True
+    for key, result in client.download_many(_items(args), args.output, max_workers=args.jobs, resume=args.resume):
+        ok = _print(key, result) and ok
+    return ok
+
+
+def _list(client, args: argparse.Namespace) -> bool:
+    if not args.all:
+        result = client.list(search=args.search, sort=args.sort)
+        if not result.get('success'):
+            return _print('list', result)
+        nodes = result['nodes']
+    else:
+        nodes = client.iter_files(search=args.search, sort=args.sort)
+    try:
+        for node in nodes:
+            print(json.dumps(node.to_dict()), flush=True)
+    except FileioError as e:
+        return _print('list', e.result)
+    return True
+
+
+def _rm(client, args: argparse.Namespace) -> bool:
+    ok = True
+    for key, result in client.delete_many(_items(args), max_workers=args.jobs):
+        ok = _print(key, result) and ok
+    return ok
+
+
+def _me(client, args: argparse.Namespace) -> bool:
+    return _print('me', client.me())
+
+
+def _bool(value: str) -> bool:
+    if value.lower() in ('true', 'yes', '1'):
+        return True
+    if value.lower() in ('false', 'no', '0'):
+        return False
+    raise argparse.ArgumentTypeError('expect true or false, got {!r}'.format(value))
+
+
+def _parser() -> argparse.ArgumentParser:
+    def add_options(parser, defaults):
+        parser.add_argument('--api-key', default=defaults.get('api_key', argparse.SUPPRESS),
+                            help='API key of file.io account, default to FILEIO_API_KEY environment variable')
+        parser.add_argument('-j', '--jobs', type=int, default=defaults.get('jobs', argparse.SUPPRESS),
+                            help='parallel workers sharing one connection pool')
+        parser.add_argument('--rate-limit', type=float, default=defaults.get('rate_limit', argparse.SUPPRESS),
+                            help='max requests per second of all workers')
+        parser.add_argument('--url', default=defaults.get('url', argparse.SUPPRESS),
+                            help='base url of a file.io compatible server, e.g. a mock server')
+
+    parser = argparse.ArgumentParser(prog='fileio', description='Command-line client of file.io. '
+                                     'Results are printed as JSON lines, one per file, key or node.')
+    add_options(parser, {'api_key': os.getenv('FILEIO_API_KEY'), 'jobs': 8, 'rate_limit': None, 'url': None})
+    # Same options are accepted after the command too, without overriding values given before it
+    common = argparse.ArgumentParser(add_help=False)
+    add_options(common, {})
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    def add_items(subparser, metavar, help):
+        subparser.add_argument('items', nargs='*', metavar=metavar, help=help)
+        subparser.add_argument('-T', '--from-file', metavar='FILE',
+                               help='read newline-delimited {}s from FILE, - for stdin'.format(metavar.lower()))
+
+    upload = subparsers.add_parser('upload', parents=[common], help='upload files')
+    add_items(upload, 'PATH', 'file paths or glob patterns, - to upload stdin')
+    upload.add_argument('--name', help='filename of upload from stdin')
+    upload.add_argument('--expires', help="e.g. '1d' or '20230228T210102', default to 2 weeks")
+    upload.add_argument('--max-downloads', type=int)
+    upload.add_argument('--auto-delete', type=_bool, metavar='{true,false}')
+    upload.set_defaults(func=_upload)
+
+    download = subparsers.add_parser('download', parents=[common], help='download files')
+    add_items(download, 'KEY', 'keys of files')
+    download.add_argument('-o', '--output', default='.', help='directory to save files to, - to write to stdout')
+    download.add_argument('--resume', action='store_true', help='keep partial downloads and continue them')
+    download.set_defaults(func=_download)
+
+    list_ = subparsers.add_parser('list', parents=[common], help='list files of account')
+    list_.add_argument('--search')
+    list_.add_argument('--sort', help="key to sort files with, e.g. 'name', 'size' or 'expires'")
+    list_.add_argument('--all', action='store_true', help='list every page')
+    list_.set_defaults(func=_list)
+
+    rm = subparsers.add_parser('rm', parents=[common], help='delete files of account')
+    add_items(rm, 'KEY', 'keys of files')
+    rm.set_defaults(func=_rm)
+
+    me = subparsers.add_parser('me', parents=[common], help='show account information')
+    me.set_defaults(func=_me)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    """Entry point of fileio console script
+
+    Example:
+        fileio upload 'logs/*.log' --expires 1d -j 16
+        find build -name '*.zip' | fileio upload -T -
+        tar c src | fileio upload - --name src.tar
+        fileio list --all | jq -r .key | fileio download -T - -o downloads
+        fileio download ZDu1og7rOkJq -o - | tar x
+
+    Return:
+        Exit status, 0 if every operation succeeded, 1 otherwise
+    """
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.command in ('list', 'rm', 'me') and not args.api_key:
+        parser.error('{} requires --api-key or FILEIO_API_KEY environment variable'.format(args.command))
+    if args.command in ('upload', 'download', 'rm') and not args.items and not args.from_file:
+        parser.error('{} requires items or --from-file'.format(args.command))
+    client = _client(args)
+    try:
+        return 0 if args.func(client, args) else 1
+    except BrokenPipeError:
+        # Reader of stdout went away, e.g. `fileio list --all | head`. Silence flush of stdout at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        client.close()
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Seconds of each unit of count-down format of expires
+_UNITS = {'y': 365 * 86400, 'Q': 91 * 86400, 'M': 30 * 86400, 'w': 7 * 86400, 'd': 86400, 'h': 3600, 'm': 60, 's': 1}
+
+
+def _expiry(expires) -> Optional[float]:
+    """Parse expires field of a result into a POSIX timestamp, None for no expires or unknown format"""
+    try:
+        return datetime.fromisoformat(expires.replace('Z', '+00:00')).timestamp() if expires else None
+    except (AttributeError, ValueError):
+        return None
+
+
+def _relative_expiry(expires) -> Optional[float]:
+    """Get POSIX timestamp a relative expires of upload resolves to if sent now, None if expires is not relative
+
+    Count-down format, timedelta and the default of file.io (2 weeks) are relative
+    """
+    if isinstance(expires, timedelta):
+        return time.time() + expires.total_seconds()
+    if expires == '__default':
+        return time.time() + 14 * 86400
+    match = re.match(r'^([1-9][0-9]*)([yQMwdhms])$', expires) if isinstance(expires, str) else None
+    return time.time() + int(match.group(1)) * _UNITS[match.group(2)] if match else None
+
+
+class DedupIndex(object):
+    def __init__(self, path: str = ':memory:', chunk_size: int = 1024 * 1024, margin: float = 60) -> None:
+        """Constructor of DedupIndex Class
+
+        Local index of uploaded content, so uploading an identical file again returns the file already hosted
+        Index maps path/size/mtime to content hash, and content hash to the result of its upload
+        Hash is computed chunk by chunk and cached per mtime, so unchanged large files are never read twice
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX', dedup=DedupIndex('fileio_dedup.db'))
+            fileio.upload('build.zip')  # upload
+            fileio.upload('build.zip')  # same file, result of previous upload with 'deduplicated': True
+
+        Args:
+            path: SQLite file to keep index in. Default keeps index in memory only
+            chunk_size: Bytes count read at once while hashing
+            margin: Seconds before expiry a hosted file is no longer reused
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS hashes '
+                         '(path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS uploads '
+                         '(digest TEXT, scope TEXT, options TEXT, key TEXT, expires REAL, result TEXT, '
+                         'PRIMARY KEY (digest, scope, options))')
+        self._db.execute('CREATE INDEX IF NOT EXISTS uploads_key ON uploads (key)')
+        self._db.commit()
+
+    def digest(self, path: str) -> str:
+        """Get SHA-256 of file content, read file only if size or mtime changed since last time"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            row = self._db.execute('SELECT size, mtime_ns, digest FROM hashes WHERE path = ?', (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            chunk = f.read(self.chunk_size)
+            while chunk:
+                sha256.update(chunk)
+                chunk = f.read(self.chunk_size)
+        digest = sha256.hexdigest()
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)',
+                             (path, st.st_size, st.st_mtime_ns, digest))
+            self._db.commit()
+        return digest
+
+    def lookup(self, digest: str, scope: str, options: str) -> Optional[dict]:
+        """Get result of a previous upload of same content and options, None if there is none still valid"""
+        with self._lock:
+            row = self._db.execute('SELECT expires, result FROM uploads WHERE digest = ? AND scope = ? AND options = ?',
+                                   (digest, scope, options)).fetchone()
+        if row is None or (row[0] is not None and row[0] < time.time() + self.margin):
+            return None
+        return json.loads(row[1])
+
+    def record(self, digest: str, scope: str, options: str, result: dict) -> None:
+        """Remember result of a successful upload"""
+        expires = _expiry(result.get('expires'))
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?)',
+                             (digest, scope, options, result.get('key'), expires, json.dumps(result)))
+            self._db.commit()
+
+    def forget(self, key: str) -> None:
+        """Drop uploads of a file that was deleted or downloaded, since it may no longer be available"""
+        with self._lock:
+            self._db.execute('DELETE FROM uploads WHERE key = ?', (key,))
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close SQLite file"""
+        with self._lock:
+            self._db.close()
@@ -1,10 +1,33 @@
+import contextlib
+import hashlib
 import io
+import itertools
 import json
+import logging
 import os
 import re
-import requests
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Union, Callable, Literal
+from typing import Union, Literal, Iterator, Iterable, BinaryIO, Callable, Tuple
+from ._ratelimit import _TokenBucket
+from ._lazy import _LazyModule
+from ._timing import _timed_adapter, _connect_time, _reset_connect_time
+from .retry import RetryPolicy
+from .cache import MetadataCache
+from .dedup import DedupIndex, _expiry, _relative_expiry
+from .journal import UploadJournal, _load_checkpoint, _save_checkpoint
+from .results import FileNode, UploadResult, ListResult, AccountInfo, DownloadResult
+from ._singleflight import _SingleFlight
+from ._streams import _IterStream, _MultipartStream, _Spool, _guess_filename, _pipe_from, _piped, _read_chunks, _map_file, \
+    _unmap, _buffer, _check_source
+from . import _compression, _tree
+
+# Heavy dependencies take longer to import than the rest of the package, import them on first use
+requests = _LazyModule('requests')
+futures = _LazyModule('concurrent.futures')
+
+logger = logging.getLogger(__name__)
 
 
 class class_or_instancemethod(classmethod):
@@ -17,11 +40,89 @@ class class_or_instancemethod(classmethod):
         return descr_get(instance, type_)
 
 
+def _format_queries(queries: dict) -> str:
+    """Format dict of query data into query string, values that are not assigned are dropped"""
+    queries = ['{}={}'.format(key, val) for key, val in queries.items() if val]
+    return '?{}'.format('&'.join(queries)) if queries else ''
+
+
+def _format_files(files: dict) -> dict:
+    """Format dict of files data into values file.io accepts
+
+    '__default' values are dropped, expires in datetime or timedelta is converted to ISO 8601 format
+    """
+    if 'file' not in files:
+        pass
+    elif files['file'] == '__default':
+        del files['file']
+    else:
+        files['file'] = files['file'] if files['file'] else ''
+    if 'expires' not in files:
+        pass
+    elif files['expires'][1] == '__default':
+        del files['expires']
+    else:
+        files['expires'][1] = files['expires'][1].isoformat() if isinstance(files['expires'][1], datetime) \
+            else (datetime.now() + files['expires'][1]).isoformat() if isinstance(files['expires'][1], timedelta) \
+            else files['expires'][1] if files['expires'][1] else ''
+    if 'maxDownloads' not in files:
+        pass
+    elif files['maxDownloads'][1] == '__default':
+        del files['maxDownloads']
+    else:
+        files['maxDownloads'][1] = str(files['maxDownloads'][1]) if files['maxDownloads'][1] else ''
+    if 'autoDelete' not in files:
+        pass
+    elif files['autoDelete'][1] == '__default':
+        del files['autoDelete']
+    else:
+        files['autoDelete'][1] = str(files['autoDelete'][1]).lower() if files['autoDelete'][1] else ''
+    return files
+
+
+def _temp_path(path: str) -> str:
+    """Get a unique hidden sibling of path to write a download to, so path only changes once download is complete"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, '.{}.{}.tmp'.format(name, os.urandom(4).hex()))
+
+
+_request_ids = itertools.count(1)
+
+
+class FileioError(Exception):
+    """Error raised by streaming methods which are not able to return a result dict
+
+    The result dict is kept in attribute result, same format as the dict returned by other methods
+    """
+
+    def __init__(self, result: dict) -> None:
+        super().__init__(result.get('message'))
+        self.result = result
+
+
 class Fileio(object):
     url = 'https://file.io/'
     headers = {'accept': 'application/json'}
+    pool_size = 10
+    chunk_size = 64 * 1024
+    checkpoint_size = 8 * 1024 * 1024
+    mmap_threshold = 1024 * 1024
+    single_flight = True
+    spool_size = 8 * 1024 * 1024
+    rate_limit = None
+    max_workers = 8
+    retry = RetryPolicy()
+    cache = None
+    dedup = None
+    lifecycle = None
+    _session = None
+    _bucket = None
+    _hooks = None
+    _flights = None
+    _session_lock = threading.Lock()
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: str, pool_size: int = 10, rate_limit: float = None, max_workers: int = 8,
+                 retry: RetryPolicy = RetryPolicy(), cache: MetadataCache = None, dedup: DedupIndex = None) -> None:
         """Constructor of Fileio Class
 
         Construct Fileio instance with api_key
@@ -34,6 +135,14 @@ class Fileio(object):
         Args:
             api_key: API Key of file.io account
                 You can get API Key of account at https://www.file.io/account/apikeys
+            pool_size: Max number of keep-alive connections kept open to file.io
+                Calls made from more threads than pool_size still work, extra connections are just not reused
+            rate_limit: Max requests per second shared by every call of the instance. None for no limit.
+                Check fileio.me()['rateLimit'] for limit of your account
+            max_workers: Default number of threads used by upload_many, download_many, delete_many and update_many
+            retry: RetryPolicy deciding which failed requests are sent again. None to never retry.
+            cache: MetadataCache serving results of list and me. None to always request file.io
+            dedup: DedupIndex to skip uploading a file whose identical content is still hosted. None to always upload
         """
         self.api_key = api_key
         self.headers = {
@@ -42,63 +151,330 @@ class Fileio(object):
             # requests won't add a boundary if this header is set when you pass files=
             # 'Content-Type': 'multipart/form-data',
         }
+        self.pool_size = pool_size
+        self.rate_limit = rate_limit
+        self.max_workers = max_workers
+        self.retry = retry
+        self.cache = cache
+        self.dedup = dedup
+        self._session = None
+        self._bucket = None
+        self._hooks = None
+        self._flights = None
+        self._session_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     @class_or_instancemethod
-    def __do_request(self, method: Callable, path: str = '', queries: dict = {}, headers: dict = {},
+    def __get_session(self) -> 'requests.Session':
+        """Get the pooled session of class or instance
+
+        A private method that lazily creates the requests.Session shared by every call of the class or instance
+        The session keeps connections alive, so repeated calls skip the TCP and TLS handshake
+        Class and each instance own separated sessions, so auth headers and pools never mixed up
+
+        Return:
+            requests.Session of the class or instance
+        """
+        # Look up own __dict__ only, subclass or instance should not borrow session of Fileio class
+        session = self.__dict__.get('_session')
+        if session is None:
+            with self._session_lock:
+                session = self.__dict__.get('_session')
+                if session is None:
+                    session = requests.Session()
+                    adapter = _timed_adapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return session
+
+    @class_or_instancemethod
+    def __coalesce(self, key: tuple, func: Callable[[], object], close: Callable[[object], None] = None,
+                   handoff: Callable[[object], object] = None):
+        """Merge concurrent identical calls of class or instance into one
+
+        A private method that runs func, or waits for the call with same key already in flight and shares its result,
+        so one request to file.io serves every caller. Calls of class and each instance are merged separately.
+        Use as context manager, close is called with result once every caller sharing it left the block.
+        Waiting callers get handoff of result instead if assigned, see _SingleFlight.share.
+        With single_flight False, every call runs func on its own.
+        """
+        if not self.single_flight:
+            return _SingleFlight().share(key, func, close, handoff)
+        flights = self.__dict__.get('_flights')
+        if flights is None:
+            with self._session_lock:
+                flights = self.__dict__.get('_flights')
+                if flights is None:
+                    flights = self._flights = _SingleFlight()
+        return flights.share(key, func, close, handoff)
+
+    @class_or_instancemethod
+    def __account(self) -> str:
+        """Get an opaque id of the account of instance for cache keys, so API key itself is never stored"""
+        api_key = getattr(self, 'api_key', None)
+        return hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else 'anonymous'
+
+    @class_or_instancemethod
+    def __flight_key(self, cache_key: tuple) -> tuple:
+        """Key to merge a cached call with, calls started before and after a cache change are not merged"""
+        return cache_key + (self.cache.generation,) if self.cache else cache_key
+
+    @class_or_instancemethod
+    def add_hook(self, event: str, callback: Callable[[dict], None]) -> None:
+        """Register a callback on request events of class or instance
+
+        Every callback is called with a dict of request info, the same dict for every event of a request
+        Exceptions raised by callback are logged to logger 'fileio_wrapper.fileio_wrapper' and do not affect the request
+        Events:
+            'request_start': before the first attempt
+            'request_end': after the body is completely received, or the request failed
+            'bytes_sent': after a chunk of the body is handed to the connection
+            'bytes_received': after a chunk of the response body is received
+            'retry': before waiting to send the request again
+        Keys of request info:
+            'id', 'event', 'method', 'url', 'attempt', 'status', 'error',
+            'bytes_sent', 'bytes_received', 'size_sent', 'size_received' (None if not known),
+            'delay' (seconds to wait before retry),
+            'connect', 'send', 'wait', 'ttfb', 'transfer', 'total' (seconds of last attempt, set on 'request_end'),
+            'dns', 'tls' (seconds of 'connect' spent on name resolution and TLS handshake, the rest is TCP)
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
+            fileio.add_hook('bytes_received', lambda info: print(info['bytes_received'], info['size_received']))
+            fileio.add_hook('request_end', lambda info: print(info['method'], info['ttfb'], info['transfer']))
+
+        Args:
+            event: Name of event
+            callback: Function called with dict of request info
+        """
+        if event not in ('request_start', 'request_end', 'bytes_sent', 'bytes_received', 'retry'):
+            raise ValueError('Unknown event {}'.format(event))
+        with self._session_lock:
+            hooks = dict(self.__dict__.get('_hooks') or {})
+            hooks[event] = hooks.get(event, ()) + (callback,)
+            self._hooks = hooks
+
+    @class_or_instancemethod
+    def remove_hook(self, event: str, callback: Callable[[dict], None]) -> None:
+        """Unregister a callback registered by add_hook"""
+        with self._session_lock:
+            hooks = dict(self.__dict__.get('_hooks') or {})
+            hooks[event] = tuple(hook for hook in hooks.get(event, ()) if hook != callback)
+            self._hooks = hooks
+
+    @class_or_instancemethod
+    def __emit(self, event: str, info: dict) -> None:
+        hooks = self.__dict__.get('_hooks')
+        if hooks and hooks.get(event):
+            info['event'] = event
+            for hook in hooks[event]:
+                try:
+                    hook(info)
+                except Exception:
+                    # A failing callback must not break the request or the other callbacks
+                    logger.exception('Hook %r failed on %s of %s %s', hook, event, info.get('method'), info.get('url'))
+
+    @class_or_instancemethod
+    def __on_sent(self, info: dict, size: int) -> None:
+        info['bytes_sent'] += size
+        info['_sent_at'] = time.perf_counter()
+        self.__emit('bytes_sent', info)
+
+    @class_or_instancemethod
+    def __on_received(self, info: dict, size: int) -> None:
+        info['bytes_received'] += size
+        self.__emit('bytes_received', info)
+
+    @class_or_instancemethod
+    def __finish(self, info: dict) -> None:
+        """Fill timings of last attempt into request info and emit 'request_end', only once per request"""
+        if info.get('total') is not None:
+            return
+        now = time.perf_counter()
+        started = info.pop('_started')
+        headers_at = info.pop('_headers_at', None) or now
+        sent_at = info.pop('_sent_at', None) or started + info['connect']
+        info['send'] = max(0.0, sent_at - started - info['connect'])
+        info['wait'] = max(0.0, headers_at - sent_at)
+        info['ttfb'] = headers_at - started
+        info['transfer'] = now - headers_at
+        info['total'] = now - started
+        self.__emit('request_end', info)
+
+    @class_or_instancemethod
+    def __iter_body(self, resp: 'requests.Response', chunk_size: int = None) -> Iterator[bytes]:
+        """Iterate over body of a response returned by __send with stream=True, reporting progress to hooks"""
+        info = resp.fileio_info
+        try:
+            for chunk in resp.iter_content(chunk_size or self.chunk_size):
+                self.__on_received(info, len(chunk))
+                yield chunk
+        except BaseException as e:
+            info['error'] = repr(e)
+            raise
+        finally:
+            self.__finish(info)
+
+    @class_or_instancemethod
+    def __release(self, resp: 'requests.Response') -> None:
+        """Close a response returned by __send with stream=True without reading its body"""
+        resp.close()
+        self.__finish(resp.fileio_info)
+
+    @class_or_instancemethod
+    def __send(self, method: str, url: str, stream: bool = False, **kwargs) -> 'requests.Response':
+        """Send a request through the pooled session
+
+        A private method that every request goes through, so rate limit is shared by every call of the class or instance
+        Failed request is sent again as retry policy decides. 429 Too Many Requests pauses the rate limiter,
+        so every other call of the class or instance backs off too.
+        Request events are emitted to hooks. Body of stream=True response has to be read with __iter_body,
+        so 'request_end' is emitted after the transfer.
+
+        Args:
+            method: Request method name to apply [GET, POST, PUT, PATCH, DELETE]
+            url: Full url to request
+            stream: Whether to return before body is read
+            kwargs: Arguments passed to requests.Session.request
+
+        Return:
+            requests.Response of the last attempt, with request info in attribute fileio_info
+        """
+        bucket = self.__dict__.get('_bucket')
+        if bucket is None or bucket.rate != self.rate_limit:
+            with self._session_lock:
+                bucket = self.__dict__.get('_bucket')
+                if bucket is None or bucket.rate != self.rate_limit:
+                    bucket = _TokenBucket(self.rate_limit)
+                    self._bucket = bucket
+
+        data = kwargs.get('data')
+        info = {
+            'id': next(_request_ids),
+            'method': method,
+            'url': url,
+            'attempt': 0,
+            'status': None,
+            'error': None,
+            'bytes_sent': 0,
+            'bytes_received': 0,
+            'size_sent': getattr(data, 'len', None),
+            'size_received': None,
+            'connect': 0.0,
+            'dns': 0.0,
+            'tls': 0.0,
+        }
+        if data is not None:
+            data.callback = lambda size: self.__on_sent(info, size)
+        self.__emit('request_start', info)
+
+        replayable = data is None or data.rewindable
+        while True:
+            info['attempt'] += 1
+            bucket.acquire()
+            _reset_connect_time()
+            info['_started'] = time.perf_counter()
+            try:
+                resp = self.__get_session().request(method, url, stream=True, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                info['connect'], info['dns'], info['tls'] = map(_connect_time, ('connect', 'dns', 'tls'))
+                info['error'] = repr(e)
+                # Nothing reached the server if connection could not be opened or no byte of body was sent yet
+                sent = not isinstance(e, requests.ConnectTimeout) and (data is None or info['bytes_sent'] > 0)
+                if not self.retry or not self.retry.should_retry(method, info['attempt'], None, replayable, sent):
+                    self.__finish(info)
+                    raise
+                delay = self.retry.delay(info['attempt'])
+            else:
+                info['_headers_at'] = time.perf_counter()
+                info['connect'], info['dns'], info['tls'] = map(_connect_time, ('connect', 'dns', 'tls'))
+                info['status'] = resp.status_code
+                info['error'] = None
+                if not self.retry or not self.retry.should_retry(method, info['attempt'], resp.status_code,
+                                                                 replayable):
+                    length = resp.headers.get('Content-Length')
+                    info['size_received'] = int(length) if length and length.isdigit() else None
+                    resp.fileio_info = info
+                    if not stream:
+                        try:
+                            self.__on_received(info, len(resp.content))
+                        except BaseException as e:
+                            info['error'] = repr(e)
+                            raise
+                        finally:
+                            self.__finish(info)
+                    return resp
+                delay = self.retry.delay(info['attempt'], resp.headers.get('Retry-After'))
+                if resp.status_code == 429:
+                    bucket.pause(delay)
+                resp.close()
+            info['delay'] = delay
+            info.pop('_sent_at', None)
+            info.pop('_headers_at', None)
+            self.__emit('retry', info)
+            time.sleep(delay)
+            if data is not None:
+                data.rewind()
+                info['bytes_sent'] = 0
+
+    @class_or_instancemethod
+    def close(self) -> None:
+        """Close pooled connections
+
+        Close keep-alive connections of class or instance. Session will be recreated on next call.
+        Instance can also be used as context manager to close connections automatically.
+
+        Example:
+            Fileio.close()  # close connections of non-auth calls
+            with Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX') as fileio:
+                fileio.upload('myfile.txt')
+        """
+        with self._session_lock:
+            session = self.__dict__.get('_session')
+            if session is not None:
+                session.close()
+                self._session = None
+
+    @class_or_instancemethod
+    def __do_request(self, method: str, path: str = '', queries: dict = {}, headers: dict = {},
                      files: dict = {}) -> dict:
         """Make a request to file.io
 
         A private method that formatting request and result
 
         Args:
-            method: Request method to apply [GET, POST, PUT, PATCH, DELETE]
+            method: Request method name to apply [GET, POST, PUT, PATCH, DELETE]
             queries: Dict of query data.
             headers: Dict of header data. No need in general case.
-            files: Dict of files data.
+            files: Dict of files data. Encoded as a streaming multipart body, see _MultipartStream
 
         Return:
             Dict loads from result json
             Should always have following Keys: 'success', 'status', 'key'
         """
-        # Formatting queries
-        queries = ['{}={}'.format(key, val) for key, val in queries.items() if val]
-        queries = '?{}'.format('&'.join(queries)) if queries else ''
+        queries = _format_queries(queries)
 
         # Not use auth if api_key not assigned(as class method)
         # Use auth if api_key assigned(as instance method)
         headers = headers if headers else self.headers
 
-        # Formatting files
-        if 'file' not in files:
-            pass
-        elif files['file'] == '__default':
-            del files['file']
-        else:
-            files['file'] = files['file'] if files['file'] else ''
-        if 'expires' not in files:
-            pass
-        elif files['expires'][1] == '__default':
-            del files['expires']
-        else:
-            files['expires'][1] = files['expires'][1].isoformat() if isinstance(files['expires'][1], datetime) \
-                else (datetime.now() + files['expires'][1]).isoformat() if isinstance(files['expires'][1], timedelta) \
-                else files['expires'][1] if files['expires'][1] else ''
-        if 'maxDownloads' not in files:
-            pass
-        elif files['maxDownloads'][1] == '__default':
-            del files['maxDownloads']
-        else:
-            files['maxDownloads'][1] = str(files['maxDownloads'][1]) if files['maxDownloads'][1] else ''
-        if 'autoDelete' not in files:
-            pass
-        elif files['autoDelete'][1] == '__default':
-            del files['autoDelete']
-        else:
-            files['autoDelete'][1] = str(files['autoDelete'][1]).lower() if files['autoDelete'][1] else ''
+        files = _format_files(files)
         key = None if path == 'me' else path
 
+        # Stream multipart body instead of letting requests build it in memory
+        data = None
+        if files:
+            data = _MultipartStream(files, self.chunk_size)
+            headers = dict(headers, **{'Content-Type': data.content_type})
+
         try:
-            resp = method(self.url + path + queries, headers=headers, files=files)
+            resp = self.__send(method, self.url + path + queries, headers=headers, data=data)
             resp = json.loads(
                 resp.text if resp.text else '{{"success": true, "status": {}, "key": {} }}'.format(resp.status_code,
                                                                                                    '"{}"'.format(
@@ -122,19 +498,31 @@ class Fileio(object):
             }
 
     @class_or_instancemethod
-    def upload(self, file: str, expires: Union[str, datetime, timedelta] = '__default',
-               max_downloads: int = '__default', auto_delete: bool = '__default') -> dict:
+    def upload(self, file: Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, Iterable[bytes]],
+               expires: Union[str, datetime, timedelta] = '__default',
+               max_downloads: int = '__default', auto_delete: bool = '__default', filename: str = None,
+               size: int = None, compress: Literal['gzip', 'zstd', 'lz4'] = None, level: int = None) -> UploadResult:
         """Uploads files and creates file details
 
         Upload a file in filesystem to file.io either auth or not
+        Body is streamed chunk by chunk, so file-like objects, pipes and generators can be uploaded without temp files
+        Bytes-like objects, e.g. bytearray or memoryview, are sent in slices without being copied, and files of at least
+        mmap_threshold bytes are mapped into memory and sent the same way, instead of being read into new buffers
+        With compress, body is compressed on a worker thread while previous chunks are being sent,
+        and codec is recorded as a suffix of filename, so download decompresses it again
 
         Example:
             fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
             result = fileio.upload('myfile.txt')  # upload with auth
             result = Fileio.upload('myfile.txt')  # upload without auth
+            result = Fileio.upload(sys.stdin.buffer, filename='backup.tar.gz')  # upload from pipe
+            result = Fileio.upload(iter_chunks(), filename='log.txt')  # upload from generator of bytes
+            result = Fileio.upload(memoryview(frame), filename='frame.bin')  # upload from memory without copying
+            result = Fileio.upload('app.log', compress='gzip')  # hosted as app.log.fileio.gz
 
         Args:
-            file: File path to upload. Notice that file size can not be 0.
+            file: File path, bytes-like object, binary file-like object or iterable of bytes to upload.
+                Notice that file size can not be 0.
                 "__default" is reserved name, not able to upgrade a file named "__default"
             expires:
                 File will be unavailable after expiration date.
@@ -152,29 +540,104 @@ class Fileio(object):
                 Auto-delete file on expiration or max downloads
                 Default value is True
                 Free account should always set auto_delete to True
+            filename: Filename shown on file.io. Use basename of file path or name of file object if not assigned
+            size: Bytes count of file-like object or iterable, if known.
+                Body is sent with chunked transfer encoding if size can not be known
+            compress: Codec to compress file with, 'gzip', or 'zstd' and 'lz4' if installed. None to upload as is.
+                Compressed upload is never retried, since body can not be replayed
+            level: Compression level of codec. Use default level of codec if not assigned
 
         Return:
-            A dict of file details
+            UploadResult of file details, also readable as a dict with file.io keys, e.g. result['maxDownloads']
+            or result.max_downloads
             Should always have following Keys: 'success', 'status', 'key'
             Most useful key-pairs are as follow:
                 'success': bool. True if upload success
                 'key': str. id of the file
                 'link': str. download url of file. This is not a direct link.
+                'deduplicated': bool. Only exists if upload is skipped since identical file is still hosted
         """
-        with open(file, 'rb') as f:
+        if compress:
+            _compression._check(compress)
+        dedup = None
+        if self.dedup and isinstance(file, (str, os.PathLike)):
+            api_key = getattr(self, 'api_key', None)
+            dedup = (self.dedup.digest(file),
+                     hashlib.sha256(api_key.encode('utf-8')).hexdigest() if api_key else 'anonymous',
+                     json.dumps([str(filename), str(expires), str(max_downloads), str(auto_delete), str(compress)]))
+            resp = self.dedup.lookup(*dedup)
+            if resp is not None and resp.get('maxDownloads') and not self.__downloadable(resp):
+                # Anyone with the link may have used up downloads of the file since it was recorded
+                self.dedup.forget(resp['key'])
+                resp = None
+            until = _relative_expiry(expires)
+            if resp is not None and until is not None and (_expiry(resp.get('expires')) or until) < until - 1:
+                # Relative expires counts from now, so the file uploaded before expires sooner than asked.
+                # Extend it if auth allows, upload again otherwise
+                extend = '14d' if expires == '__default' else expires
+                resp = self.update(resp['key'], expires=extend) if getattr(self, 'api_key', None) else None
+                if resp is not None and resp.get('success'):
+                    self.dedup.record(*dedup, resp)
+                else:
+                    resp = None
+            if resp is not None:
+                resp['deduplicated'] = True
+                return UploadResult(resp)
+
+        f = open(os.fspath(file), 'rb') if isinstance(file, (str, os.PathLike)) else None
+        source = _map_file(f, self.mmap_threshold) if f else file
+        filename = filename or _guess_filename(f or file)
+        body = source
+        if compress:
+            if _buffer(source) is None:
+                _check_source(source)
+            body = _piped(_compression.compress(_read_chunks(source, self.chunk_size), compress, level),
+                          chunk_size=self.chunk_size)
+            filename, size = filename + _compression.SUFFIXES[compress], None
+        try:
             files = {
-                'file': f,
+                'file': (filename, body, size),
                 'expires': [None, expires],
                 'maxDownloads': [None, max_downloads],
                 'autoDelete': [None, auto_delete],
             }
-            return self.__do_request(requests.post, files=files)
+            resp = self.__do_request('POST', files=files)
+        finally:
+            if compress:
+                # Stop worker thread if body was not sent completely
+                body.close()
+            if f:
+                _unmap(source)
+                f.close()
+        if self.cache and resp.get('success'):
+            # New file may show up in any page, and storage usage changed
+            self.cache.invalidate('list')
+            self.cache.invalidate('me')
+        if dedup and resp.get('success'):
+            self.dedup.record(*dedup, resp)
+        if self.lifecycle and resp.get('success'):
+            self.lifecycle.track(resp)
+        return UploadResult(resp)
+
+    @class_or_instancemethod
+    def __downloadable(self, result: dict) -> bool:
+        """Whether file of an upload result is still hosted with downloads left, always False without auth
+
+        A private method that asks file.io directly, bypassing cache, since downloads by others are not seen locally
+        """
+        if not getattr(self, 'api_key', None):
+            return False
+        resp = self.__do_request('GET', queries={'search': result.get('name')})
+        return any(node.get('key') == result.get('key') and
+                   (not node.get('maxDownloads') or node.get('downloads', 0) < node['maxDownloads'])
+                   for node in resp.get('nodes') or [])
 
-    def list(self, search: str = None, sort: str = None, offset: int = None, limit: int = None):
+    def list(self, search: str = None, sort: str = None, offset: int = None, limit: int = None) -> ListResult:
         """Get list of files for authorized user
 
         List files in an file.io accunt. Auth is needed
         Return all item by __default, return particular item with given parameter.
+        Concurrent calls of the instance with same parameters share one request, unless single_flight is False
 
         Example:
             fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
@@ -191,21 +654,74 @@ class Fileio(object):
             limit: Items count limit of return items list
 
         Return:
-            A dict of file details
-            Items list will be stored in key 'nodes'
+            ListResult of file details, also readable as a dict
+            Items list will be stored in key 'nodes', as FileNode objects
         """
+        cache_key = ('list', self.__account(), search, sort, offset, limit)
+        resp = self.cache.get(cache_key) if self.cache else None
+        if resp is not None:
+            return ListResult(resp)
         queries = {
             'search': search,
             'sort': sort,
             'offset': offset,
             'limit': limit,
         }
-        return self.__do_request(requests.get, queries=queries)
 
-    def me(self):
+        def request():
+            generation = self.cache.generation if self.cache else None
+            resp = self.__do_request('GET', queries=queries)
+            if self.cache and resp.get('success'):
+                self.cache.set(cache_key, resp, generation)
+            return resp
+
+        with self.__coalesce(self.__flight_key(cache_key), request) as resp:
+            return ListResult(resp)
+
+    def iter_files(self, search: str = None, sort: str = None, page_size: int = 100) -> Iterator[FileNode]:
+        """Iterate over every file of authorized user
+
+        Walk all pages of list lazily. Next page is fetched in background while current page is consumed,
+        so at most two pages are held in memory. Stop after the last page.
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
+            total_size = sum(node['size'] for node in fileio.iter_files(search='log'))
+
+        Args:
+            search: Keyword to search, same as list
+            sort: Key to sort items with, same as list
+            page_size: Items count of each page
+
+        Return:
+            Iterator of FileNode, same as items in key 'nodes' of list
+
+        Raise:
+            FileioError: if a page can not be listed
+        """
+        with futures.ThreadPoolExecutor(max_workers=1) as executor:
+            offset = 0
+            future = executor.submit(self.list, search, sort, offset, page_size)
+            while future is not None:
+                page = future.result()
+                if not page.get('success'):
+                    raise FileioError(page)
+                nodes = page.get('nodes') or []
+                offset += len(nodes)
+                # Server may cap page below page_size, so a short page is only the last one if count is unknown
+                if isinstance(page.get('count'), int):
+                    last = not nodes or offset >= page['count']
+                else:
+                    last = len(nodes) < page_size
+                future = None if last else executor.submit(self.list, search, sort, offset, page_size)
+                for node in nodes:
+                    yield node
+
+    def me(self) -> AccountInfo:
         """Get plan/account details for authorized user
 
         Get account info, such as "Current account plan", "Storage limit", Uupload size restriction", etc...
+        Concurrent calls of the instance share one request, unless single_flight is False
 
         Example:
             fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
@@ -215,21 +731,107 @@ class Fileio(object):
             used_storage = resp['usedStorageBytes']
 
         Return:
-            A dict of account details
+            AccountInfo of account details, also readable as a dict
         """
-        return self.__do_request(requests.get, path='me')
+        cache_key = ('me', self.__account())
+        resp = self.cache.get(cache_key) if self.cache else None
+        if resp is not None:
+            return AccountInfo(resp)
+
+        def request():
+            generation = self.cache.generation if self.cache else None
+            resp = self.__do_request('GET', path='me')
+            if self.cache and resp.get('success'):
+                self.cache.set(cache_key, resp, generation)
+            return resp
+
+        with self.__coalesce(self.__flight_key(cache_key), request) as resp:
+            return AccountInfo(resp)
 
     @class_or_instancemethod
-    def download(self, key: str, filepath: str = None):
+    def __open_download(self, key: str, headers: dict = None):
+        """Open a streaming download response
+
+        A private method that sends the download request without reading the body.
+        Caller is responsible to close the response.
+
+        Args:
+            key: key of file in file.io
+            headers: Extra headers, e.g. Range
+
+        Return:
+            requests.Response with the body not consumed yet and the filename parsed from content-disposition
+
+        Raise:
+            FileioError: if file.io can not be reached or the file is not available
+        """
+        headers = dict(self.headers, **(headers or {}))
+        headers['accept'] = '*/*'
+
+        try:
+            resp = self.__send('GET', self.url + key, headers=headers, stream=True)
+        except requests.RequestException as e:
+            raise FileioError({
+                'success': False,
+                'status': 503,
+                'code': 'SERVICE_UNAVAILABLE',
+                'message': 'Not able to connect to file.io server',
+                'key': key
+            }) from e
+        match = re.search('filename=([^;]+);?', resp.headers.get('content-disposition', ''))
+        if not match:
+            self.__release(resp)
+            raise FileioError({
+                'success': False,
+                'status': resp.status_code,
+                'code': 'SERVICE_UNAVAILABLE',
+                'message': 'Not able to connect to file.io server',
+                'key': key
+            })
+        if self.cache:
+            # Download count changed, file may even be deleted after download
+            self.cache.invalidate('list', file_key=key)
+        if self.dedup:
+            self.dedup.forget(key)
+        return resp, match.group(1)
+
+    @class_or_instancemethod
+    def __iter_content(self, resp: 'requests.Response', filename: str, chunk_size: int = None,
+                       decompress: bool = True) -> Tuple[Iterator[bytes], str]:
+        """Iterate over body of a download response, decompressed if file was compressed by upload
+
+        Return:
+            Iterator of byte-type chunks and filename without codec suffix
+        """
+        codec = _compression.codec_of(filename) if decompress else None
+        if codec is None:
+            return self.__iter_body(resp, chunk_size), filename
+        chunks = _compression.decompress(self.__iter_body(resp, chunk_size), codec)
+        return chunks, filename[:-len(_compression.SUFFIXES[codec])]
+
+    @class_or_instancemethod
+    def download(self, key: str, filepath: str = None, chunk_size: int = None, resume: bool = False,
+                 decompress: bool = True) -> DownloadResult:
         """Dlownloads the file identified by key
 
         Download file with key.
         Return raw byte-type data if filepath parameter didn't assigned
         Return download result if filepath parameter assigned and download file to the filepath
+        File is streamed to filepath chunk by chunk, so memory usage does not grow with file size
+        With resume, file is written to a .part file, and a download interrupted before is continued with a
+        Range request from its last checkpoint instead of from the first byte
+        File compressed by upload is decompressed on the fly, except with resume, which keeps file as hosted
+        Concurrent downloads of the same key by class or instance are merged into one request, unless single_flight
+        is False or resume is used. First caller downloads as usual, waiting callers copy its file through a spool
 
         Args:
             key: key of file in file.io
             filepath: filepath of local filesystem
+            chunk_size: Bytes count of each chunk written to filepath. Use Fileio.chunk_size if not assigned
+            resume: Whether to keep partial download on failure and continue it on next call. Only with filepath.
+                Notice that file.io counts every request as a download, so only use it on files that allow
+                enough downloads
+            decompress: Whether to decompress file compressed by upload. False to get file as hosted
 
         Example:
             fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
@@ -241,44 +843,472 @@ class Fileio(object):
             raw data = ret_json['content']
             ret_json = fileio.download('ZDu1og7rOkJq', 'file.txt')  # Save to file if assigned filename with assigned filename
             ret_json = fileio.download('ZDu1og7rOkJq', 'content/')  # Save to file if assigned exist directory with original filename
+            ret_json = fileio.download('ZDu1og7rOkJq', 'big.iso', resume=True)  # Call again after failure to continue
 
         Return:
-            Return raw byte-type data if filepath parameter didn't assigned
+            DownloadResult, also readable as a dict
+            Return raw byte-type data in 'content' if filepath parameter didn't assigned,
+            and a zero-copy memoryview of it in attribute body
             Return download result if filepath parameter assigned and download file to the filepath
+            'offset': int. Only exists on failure with resume, bytes count kept for next call
         """
-        headers = self.headers.copy()
-        headers['accept'] = '*/*'
+        if filepath and resume:
+            return self.__download_resumable(key, filepath, chunk_size)
+        if self.single_flight:
+            return self.__download_shared(key, filepath, chunk_size, decompress)
+        return self.__download_direct(key, filepath, chunk_size, decompress)[0]
+
+    @class_or_instancemethod
+    def __download_direct(self, key: str, filepath: str = None, chunk_size: int = None,
+                          decompress: bool = True) -> Tuple[DownloadResult, str]:
+        """Download straight into memory or filepath
+
+        A private method behind download
 
+        Return:
+            Download result, same as download, and filename of file in file.io without codec suffix,
+            None if file was not downloaded
+        """
         try:
-            resp = requests.get(self.url + key, headers=headers)
-            filename = re.search('filename=([^;]+);?', resp.headers['content-disposition']).group(1)
+            resp, filename = self.__open_download(key)
+        except FileioError as e:
+            return DownloadResult(e.result), None
 
-            if not filepath:
-                return {
-                    'success': True,
-                    'status': resp.status_code,
-                    'key': key,
-                    'content': resp.content
-                }
-            else:
-                filename = os.path.join(os.path.dirname(filepath), filename) if os.path.isdir(filepath) else filepath
-                with open(filename, 'wb') as f:
-                    f.write(resp.content)
-                return {
-                    'success': True,
-                    'status': resp.status_code,
-                    'key': key,
-                    'path': os.path.dirname(os.path.abspath(filename)),
-                    'name': os.path.basename(filename),
-                }
+        try:
+            with resp:
+                chunks, filename = self.__iter_content(resp, filename, chunk_size, decompress)
+                return self.__save_download(key, resp.status_code, filename, chunks, filepath), filename
         except:
-            return {
+            self.__release(resp)
+            return DownloadResult({
                 'success': False,
-                'status': resp.status_code if 'resp' in locals() else 503,
+                'status': resp.status_code,
+                'code': 'SERVICE_UNAVAILABLE',
+                'message': 'Not able to connect to file.io server',
+                'key': key
+            }), None
+
+    @class_or_instancemethod
+    def __download_shared(self, key: str, filepath: str = None, chunk_size: int = None,
+                          decompress: bool = True) -> DownloadResult:
+        """Download once for every concurrent download of the same key
+
+        A private method behind download with single_flight.
+        First caller downloads the file straight into memory or its own filepath, same as without single_flight.
+        Only if other callers downloading the same key are waiting for it, the downloaded file is copied into a spool,
+        in memory up to spool_size bytes and on disk above, and each of them writes its own copy from the spool.
+        So file is requested once, and a file with max_downloads 1 is not consumed by one caller while others fail.
+
+        Return:
+            Download result, same as download
+        """
+        def handoff(downloaded):
+            result, filename = downloaded
+            if not result['success'] or result.get('content') is not None:
+                return result, filename, None
+            spool = _Spool(self.spool_size)
+            try:
+                with open(os.path.join(result['path'], result['name']), 'rb') as f:
+                    for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                        spool.write(chunk)
+            except BaseException:
+                spool.close()
+                raise
+            return result, filename, spool
+
+        def close(shared):
+            if len(shared) > 2 and shared[2] is not None:
+                shared[2].close()
+
+        status = 503
+        try:
+            with self.__coalesce(('download', key, decompress),
+                                 lambda: self.__download_direct(key, filepath, chunk_size, decompress),
+                                 close, handoff) as shared:
+                if len(shared) == 2:
+                    # First caller, downloaded on its own
+                    return shared[0]
+                result, filename, spool = shared
+                if not result['success']:
+                    return DownloadResult(dict(result))
+                status = result['status']
+                chunks = [result['content']] if spool is None else spool.chunks(chunk_size or self.chunk_size)
+                return self.__save_download(key, status, filename, chunks, filepath)
+        except OSError:
+            return DownloadResult({
+                'success': False,
+                'status': status,
                 'code': 'SERVICE_UNAVAILABLE',
                 'message': 'Not able to connect to file.io server',
                 'key': key
+            })
+
+    @staticmethod
+    def __save_download(key: str, status: int, filename: str, chunks: Iterator[bytes],
+                        filepath: str = None) -> DownloadResult:
+        """Join chunks of a download into content, or write them to filepath if assigned
+
+        File is written to a temp file next to filepath and renamed once complete,
+        so a broken download never leaves a truncated file in place of an existing one
+        """
+        if not filepath:
+            return DownloadResult({
+                'success': True,
+                'status': status,
+                'key': key,
+                'content': b''.join(chunks)
+            })
+        filename = os.path.join(os.path.dirname(filepath), filename) if os.path.isdir(filepath) else filepath
+        temp = _temp_path(filename)
+        try:
+            with open(temp, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(temp, filename)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp)
+            raise
+        return DownloadResult({
+            'success': True,
+            'status': status,
+            'key': key,
+            'path': os.path.dirname(os.path.abspath(filename)),
+            'name': os.path.basename(filename),
+        })
+
+    @class_or_instancemethod
+    def __download_resumable(self, key: str, filepath: str, chunk_size: int = None) -> DownloadResult:
+        """Download to a .part file that survives failures, continuing from its checkpoint
+
+        A private method behind download with resume.
+        Part file is fsynced before its offset is checkpointed, so checkpointed bytes are always on disk.
+        Part file is renamed to filepath once complete.
+
+        Args:
+            key: key of file in file.io
+            filepath: filepath of local filesystem
+            chunk_size: Bytes count of each chunk written to part file. Use Fileio.chunk_size if not assigned
+
+        Return:
+            Download result, same as download with filepath assigned
+        """
+        is_dir = os.path.isdir(filepath)
+        part = (os.path.join(filepath, key) if is_dir else filepath) + '.part'
+        checkpoint_path = part + '.checkpoint'
+        checkpoint = _load_checkpoint(checkpoint_path, key)
+        try:
+            offset = min(checkpoint.get('offset', 0), os.path.getsize(part))
+        except OSError:
+            offset = 0
+
+        headers = {}
+        if offset:
+            headers['Range'] = 'bytes={}-'.format(offset)
+            if checkpoint.get('validator'):
+                headers['If-Range'] = checkpoint['validator']
+        try:
+            resp, filename = self.__open_download(key, headers)
+            content_range = re.match(r'bytes (\d+)-\d+/(\d+)', resp.headers.get('content-range', ''))
+            if offset and resp.status_code == 206 and not (
+                    content_range and int(content_range.group(1)) == offset and
+                    int(content_range.group(2)) == checkpoint.get('size')):
+                # File changed since checkpoint, start over
+                self.__release(resp)
+                offset = 0
+                resp, filename = self.__open_download(key)
+        except FileioError as e:
+            e.result['offset'] = offset
+            return DownloadResult(e.result)
+        if resp.status_code != 206:
+            # Range not asked or not honoured, whole file comes in this response
+            offset = 0
+            size = int(resp.headers['content-length']) if 'content-length' in resp.headers else None
+            checkpoint = {
+                'key': key,
+                'size': size,
+                'validator': resp.headers.get('etag') or resp.headers.get('last-modified'),
             }
+        filename = os.path.join(filepath, filename) if is_dir else filepath
+
+        try:
+            with open(part, 'r+b' if offset else 'wb') as f:
+                f.seek(offset)
+                f.truncate()
+                try:
+                    synced = offset
+                    for chunk in self.__iter_body(resp, chunk_size):
+                        f.write(chunk)
+                        if f.tell() - synced >= self.checkpoint_size:
+                            f.flush()
+                            os.fsync(f.fileno())
+                            synced = checkpoint['offset'] = f.tell()
+                            _save_checkpoint(checkpoint_path, checkpoint)
+                finally:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    checkpoint['offset'] = f.tell()
+                    _save_checkpoint(checkpoint_path, checkpoint)
+            if checkpoint['size'] is not None and checkpoint['offset'] != checkpoint['size']:
+                raise IOError('Download ended at {} of {} bytes'.format(checkpoint['offset'], checkpoint['size']))
+            os.replace(part, filename)
+            os.remove(checkpoint_path)
+            return DownloadResult({
+                'success': True,
+                'status': resp.status_code,
+                'key': key,
+                'path': os.path.dirname(os.path.abspath(filename)),
+                'name': os.path.basename(filename),
+            })
+        except (requests.RequestException, OSError):
+            self.__release(resp)
+            return DownloadResult({
+                'success': False,
+                'status': resp.status_code,
+                'code': 'SERVICE_UNAVAILABLE',
+                'message': 'Connection to file.io server broken while downloading',
+                'key': key,
+                'offset': checkpoint.get('offset', offset),
+            })
+
+    @class_or_instancemethod
+    def iter_download(self, key: str, chunk_size: int = None, decompress: bool = True) -> Iterator[bytes]:
+        """Iterate over content of the file identified by key
+
+        Stream file content chunk by chunk without holding the whole file in memory.
+        Request is sent on first iteration.
+        File compressed by upload is decompressed on the fly.
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
+            for chunk in fileio.iter_download('ZDu1og7rOkJq'):
+                sink.write(chunk)
+
+        Args:
+            key: key of file in file.io
+            chunk_size: Bytes count of each chunk. Use Fileio.chunk_size if not assigned
+            decompress: Whether to decompress file compressed by upload. False to get file as hosted
+
+        Return:
+            Iterator of byte-type chunks
+
+        Raise:
+            FileioError: if file.io can not be reached or the file is not available
+        """
+        resp, filename = self.__open_download(key)
+        with resp:
+            try:
+                for chunk in self.__iter_content(resp, filename, chunk_size, decompress)[0]:
+                    yield chunk
+            except requests.RequestException as e:
+                raise FileioError({
+                    'success': False,
+                    'status': resp.status_code,
+                    'code': 'SERVICE_UNAVAILABLE',
+                    'message': 'Connection to file.io server broken while downloading',
+                    'key': key
+                }) from e
+
+    @class_or_instancemethod
+    def open_download(self, key: str, chunk_size: int = None, decompress: bool = True) -> io.BufferedReader:
+        """Open the file identified by key as a read-only binary file object
+
+        File-like version of iter_download for callers that pipe the data onward, e.g. shutil.copyfileobj or tarfile
+
+        Example:
+            with Fileio.open_download('ZDu1og7rOkJq') as f:
+                shutil.copyfileobj(f, sys.stdout.buffer)
+
+        Args:
+            key: key of file in file.io
+            chunk_size: Bytes count of each chunk. Use Fileio.chunk_size if not assigned
+            decompress: Same as iter_download
+
+        Return:
+            Binary file object. Close it to release the connection.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        return io.BufferedReader(_IterStream(self.iter_download(key, chunk_size, decompress)), buffer_size=chunk_size)
+
+    @class_or_instancemethod
+    def download_parallel(self, key: str, filepath: str, part_size: int = 8 * 1024 * 1024,
+                          max_workers: int = None, chunk_size: int = None) -> DownloadResult:
+        """Downloads the file identified by key with parallel HTTP Range requests
+
+        First request asks for the first part only, and learns file size from Content-Range.
+        Other parts are requested concurrently over pooled connections and written into a preallocated file at
+        their offsets. Fall back to a single stream if server answers 200 and does not honour Range.
+        Partial content without a usable Content-Range, e.g. of unknown size, is asked again without Range.
+        File is written next to filepath and renamed once every part is complete, same as download.
+        Notice that file.io may count every ranged request as a download, so only use it on files that allow
+        enough downloads.
+        File compressed by upload is written as hosted, since ranges of compressed stream can not be decompressed
+        independently.
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX', pool_size=16)
+            ret_json = fileio.download_parallel('ZDu1og7rOkJq', 'content/', part_size=16 * 1024 * 1024, max_workers=8)
+            slowest = min(chunk['bytes_per_second'] for chunk in ret_json['chunks'])
+
+        Args:
+            key: key of file in file.io
+            filepath: filepath of local filesystem, same as download
+            part_size: Bytes count of each range request
+            max_workers: Number of threads. Use max_workers of class or instance if not assigned
+            chunk_size: Bytes count of each chunk written to filepath. Use Fileio.chunk_size if not assigned
+
+        Return:
+            Download result, same as download with filepath assigned
+            'size': int. Bytes count of file
+            'chunks': list of dict of each range, with keys 'start', 'end', 'bytes', 'seconds', 'bytes_per_second'
+        """
+        chunk_size = chunk_size or self.chunk_size
+
+        def write_part(resp, fd, start, end, started):
+            position = start
+            with resp:
+                for chunk in self.__iter_body(resp, chunk_size):
+                    if hasattr(os, 'pwrite'):
+                        os.pwrite(fd, chunk, position)
+                    else:
+                        with lock:
+                            os.lseek(fd, position, os.SEEK_SET)
+                            os.write(fd, chunk)
+                    position += len(chunk)
+            if end is not None and position != end + 1:
+                raise IOError('Range {}-{} ended at {}'.format(start, end, position))
+            seconds = time.perf_counter() - started
+            return {
+                'start': start,
+                'end': position - 1,
+                'bytes': position - start,
+                'seconds': seconds,
+                'bytes_per_second': (position - start) / seconds if seconds else 0.0,
+            }
+
+        def fetch_part(fd, start, end):
+            started = time.perf_counter()
+            resp, _ = self.__open_download(key, {'Range': 'bytes={}-{}'.format(start, end)})
+            content_range = re.match(r'bytes (\d+)-', resp.headers.get('content-range', ''))
+            if resp.status_code != 206 or not content_range or int(content_range.group(1)) != start:
+                self.__release(resp)
+                raise IOError('Range {}-{} not honoured'.format(start, end))
+            return write_part(resp, fd, start, end, started)
+
+        def first_range(resp):
+            return re.match(r'bytes 0-(\d+)/(\d+)$', resp.headers.get('content-range', '').strip())
+
+        lock = threading.Lock()
+        started = time.perf_counter()
+        try:
+            resp, filename = self.__open_download(key, {'Range': 'bytes=0-{}'.format(part_size - 1)})
+            if resp.status_code == 206 and not first_range(resp):
+                # Partial content without a usable range, e.g. of unknown size, so ask for the whole file instead
+                self.__release(resp)
+                resp, filename = self.__open_download(key)
+        except FileioError as e:
+            return DownloadResult(e.result)
+        status = resp.status_code
+        filename = os.path.join(os.path.dirname(filepath), filename) if os.path.isdir(filepath) else filepath
+        content_range = first_range(resp)
+        temp = _temp_path(filename)
+        try:
+            fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+            try:
+                if status == 200:
+                    # Range not honoured, whole file comes in this response
+                    chunks = [write_part(resp, fd, 0, None, started)]
+                    size = chunks[0]['bytes']
+                elif status != 206 or not content_range:
+                    raise IOError('Status {} with Content-Range {!r} can not be written as whole file'.format(
+                        status, resp.headers.get('content-range')))
+                else:
+                    size = int(content_range.group(2))
+                    os.ftruncate(fd, size)
+                    with futures.ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+                        parts = [executor.submit(write_part, resp, fd, 0, int(content_range.group(1)), started)]
+                        parts += [executor.submit(fetch_part, fd, start, min(start + part_size, size) - 1)
+                                  for start in range(part_size, size, part_size)]
+                        chunks = [part.result() for part in parts]
+            finally:
+                os.close(fd)
+            os.replace(temp, filename)
+            return DownloadResult({
+                'success': True,
+                'status': status,
+                'key': key,
+                'path': os.path.dirname(os.path.abspath(filename)),
+                'name': os.path.basename(filename),
+                'size': size,
+                'chunks': chunks,
+            })
+        except (FileioError, requests.RequestException, OSError):
+            self.__release(resp)
+            with contextlib.suppress(OSError):
+                os.remove(temp)
+            return DownloadResult({
+                'success': False,
+                'status': status,
+                'code': 'SERVICE_UNAVAILABLE',
+                'message': 'Not able to connect to file.io server',
+                'key': key
+            })
+
+    @class_or_instancemethod
+    def transfer(self, key: str, target=None, expires: Union[str, datetime, timedelta] = '__default',
+                 max_downloads: int = '__default', auto_delete: bool = '__default', filename: str = None,
+                 buffer_size: int = 1024 * 1024, decompress: bool = False) -> UploadResult:
+        """Copies the file identified by key to a new file, without holding it in memory or writing it to disk
+
+        Download is read on a worker thread into a ring buffer of buffer_size bytes, while upload sends from it.
+        Reader waits while buffer is full and sender waits while it is empty, so copy runs at the speed of the slower
+        side with constant memory. Size of file is passed to upload, so body is sent with Content-Length.
+        Notice that transfer counts as a download of the source file, and upload is never retried,
+        since body can not be replayed.
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
+            result = fileio.transfer('ZDu1og7rOkJq', expires='1w', max_downloads=10)  # re-host with new options
+            result = Fileio.transfer('ZDu1og7rOkJq', target=fileio)  # copy an anonymous file into account
+
+        Args:
+            key: key of source file in file.io
+            target: Fileio class or instance to upload with, e.g. of another account. Use self if not assigned
+            expires, max_downloads, auto_delete: Same as upload, options of the new file
+            filename: Filename of the new file. Use filename of source file if not assigned
+            buffer_size: Bytes count of ring buffer between download and upload
+            decompress: Whether to decompress file compressed by upload. Default copies file as hosted
+
+        Return:
+            UploadResult of the new file, same as upload
+            Result of the failed download if source file is not available
+        """
+        target = target or self
+        try:
+            resp, source_name = self.__open_download(key)
+        except FileioError as e:
+            return UploadResult(e.result)
+        length = resp.headers.get('content-length')
+        codec = _compression.codec_of(source_name) if decompress else None
+        size = int(length) if length and length.isdigit() and codec is None else None
+        chunks, source_name = self.__iter_content(resp, source_name, None, decompress)
+        pumped = []
+
+        def pump(pipe):
+            pumped.append(True)
+            with resp:
+                for chunk in chunks:
+                    pipe.write(chunk)
+
+        body = _pipe_from(pump, capacity=buffer_size, chunk_size=self.chunk_size)
+        try:
+            return target.upload(body, expires=expires, max_downloads=max_downloads, auto_delete=auto_delete,
+                                 filename=filename or source_name, size=size)
+        finally:
+            # Stop worker thread if upload did not read body completely, or release download if it never started
+            body.close()
+            if not pumped:
+                self.__release(resp)
 
     def delete(self, key: str):
         """Deletes the file identified by key for authorized user
@@ -292,11 +1322,22 @@ class Fileio(object):
         Return:
             A dict of result status
         """
-        return self.__do_request(requests.delete, path=key)
+        resp = self.__do_request('DELETE', path=key)
+        if self.cache and resp.get('success'):
+            self.cache.remove_node(key)
+            self.cache.invalidate('me')
+        if self.dedup and resp.get('success'):
+            self.dedup.forget(key)
+        if self.lifecycle and resp.get('success'):
+            self.lifecycle.forget(key)
+        return resp
 
-    def update(self, key: str, file: str = '__default', expires: Union[str, datetime, timedelta] = '__default',
+    def update(self, key: str,
+               file: Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, Iterable[bytes]] = '__default',
+               expires: Union[str, datetime, timedelta] = '__default',
                max_downloads: int = '__default', auto_delete: bool = '__default',
-               mode: Literal['replace_all', 'replace_partial'] = 'replace_partial'):
+               mode: Literal['replace_all', 'replace_partial'] = 'replace_partial', filename: str = None,
+               size: int = None) -> UploadResult:
         """Updates the file identified by key for authorized user
 
         Update a valid key, such as "change file", "extend expire date", "enable auto delete"
@@ -305,7 +1346,8 @@ class Fileio(object):
             TODO
 
         Args:
-            file: File path to upload. Notice that file size can not be 0.
+            file: File path, bytes-like object, binary file-like object or iterable of bytes to upload.
+                Notice that file size can not be 0.
                 "__default" is reserved name, not able to update a file named "__default"
             expires:
                 File will be unavailable after expiration date.
@@ -327,20 +1369,288 @@ class Fileio(object):
                 String either 'replace_all' or 'replace_partial'
                 'replace_all' will update all properties even properties didn't assigned
                 'replace_partial' will update properties that had assigned value
+            filename: Filename shown on file.io. Use basename of file path or name of file object if not assigned
+            size: Bytes count of file-like object or iterable, if known
+
+        Return:
+            UploadResult of file details, same as upload
         """
-        f = file if file == '__default' else open(file, 'rb')
-        files = {
-            'file': f,
-            'expires': [None, expires],
-            'maxDownloads': [None, max_downloads],
-            'autoDelete': [None, auto_delete],
-        }
-        if isinstance(f, io.IOBase):
-            f.close()
-        if mode == 'replace_all':
-            return self.__do_request(requests.put, path=key, files=files)
-        elif mode == 'replace_partial':
-            return self.__do_request(requests.patch, path=key, files=files)
-        else:
+        if mode not in ('replace_all', 'replace_partial'):
             raise ValueError
+        f = open(os.fspath(file), 'rb') if isinstance(file, (str, os.PathLike)) and file != '__default' else None
+        source = _map_file(f, self.mmap_threshold) if f else file
+        try:
+            files = {
+                'file': file if file == '__default' else (filename or _guess_filename(f or file), source, size),
+                'expires': [None, expires],
+                'maxDownloads': [None, max_downloads],
+                'autoDelete': [None, auto_delete],
+            }
+            if mode == 'replace_all':
+                resp = self.__do_request('PUT', path=key, files=files)
+            else:
+                resp = self.__do_request('PATCH', path=key, files=files)
+        finally:
+            if f:
+                _unmap(source)
+                f.close()
+        if self.cache and resp.get('success'):
+            self.cache.patch_node(key, resp)
+            self.cache.invalidate('me')
+        if self.dedup and resp.get('success'):
+            self.dedup.forget(key)
+        if self.lifecycle and resp.get('success'):
+            self.lifecycle.track(resp)
+        return UploadResult(resp)
+
+    @class_or_instancemethod
+    def __map_completed(self, func: Callable, items: Iterable, max_workers: int = None) -> Iterator[Tuple[object, dict]]:
+        """Apply func to every item on a bounded thread pool
+
+        A private method that yields results as soon as they complete. Items are consumed lazily,
+        at most twice of max_workers items are in flight, so long iterables do not pile up futures.
+        Local errors such as missing file are turned into a result dict instead of aborting the batch.
+
+        Args:
+            func: Function called with each item, returns result dict
+            items: Iterable of items
+            max_workers: Number of threads. Use max_workers of class or instance if not assigned
+
+        Return:
+            Iterator of (item, result dict) in completion order
+        """
+        def run(item):
+            try:
+                return item, func(item)
+            except Exception as e:
+                return item, {
+                    'success': False,
+                    'status': 0,
+                    'code': 'LOCAL_ERROR',
+                    'message': str(e),
+                    'key': None
+                }
+
+        max_workers = max_workers or self.max_workers
+        pending = set()
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                for item in items:
+                    pending.add(executor.submit(run, item))
+                    if len(pending) >= 2 * max_workers:
+                        done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                while pending:
+                    done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    @class_or_instancemethod
+    def upload_many(self, files: Iterable[str], expires: Union[str, datetime, timedelta] = '__default',
+                    max_downloads: int = '__default', auto_delete: bool = '__default',
+                    max_workers: int = None, journal: UploadJournal = None) -> Iterator[Tuple[str, dict]]:
+        """Uploads many files in parallel
+
+        Upload files on a bounded thread pool sharing the connection pool and rate limit of class or instance
+        With journal, a restarted job skips files uploaded by previous runs, and uploads the rest again
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX', rate_limit=3)
+            for path, result in fileio.upload_many(glob.glob('build/*.zip'), expires='1d'):
+                print(path, result['link'])
+            for path, result in fileio.upload_many(paths, journal=UploadJournal('job.db')):  # Safe to rerun
+                print(path, result['link'])
+
+        Args:
+            files: Iterable of file paths to upload
+            expires, max_downloads, auto_delete: Same as upload, applied to every file
+            max_workers: Number of threads. Use max_workers of class or instance if not assigned
+            journal: UploadJournal recording progress of the job. None to upload every file
+
+        Return:
+            Iterator of (file path, result dict of upload) in completion order
+            Result has 'journaled': True if upload is skipped since journal shows it completed
+        """
+        options = json.dumps([str(expires), str(max_downloads), str(auto_delete)])
+
+        def upload(file):
+            if journal:
+                resp = journal.lookup(file, options)
+                if resp is not None:
+                    resp['journaled'] = True
+                    return UploadResult(resp)
+                journal.begin(file, options)
+            resp = self.upload(file, expires=expires, max_downloads=max_downloads, auto_delete=auto_delete)
+            if journal and resp.get('success'):
+                journal.complete(file, options, resp.to_dict())
+            return resp
+
+        return self.__map_completed(upload, files, max_workers)
+
+    @class_or_instancemethod
+    def download_many(self, keys: Iterable[str], dest_dir: str = '.', max_workers: int = None,
+                      resume: bool = False) -> Iterator[Tuple[str, dict]]:
+        """Downloads many files in parallel into a directory with their original filenames
+
+        Example:
+            for key, result in Fileio.download_many(keys, 'downloads'):
+                print(key, result['success'])
+
+        Args:
+            keys: Iterable of keys of files in file.io
+            dest_dir: Existed directory to download files to
+            max_workers: Number of threads. Use max_workers of class or instance if not assigned
+            resume: Same as download, applied to every file
+
+        Return:
+            Iterator of (key, result dict of download) in completion order
+        """
+        dest_dir = os.path.join(dest_dir, '')
+        return self.__map_completed(lambda key: self.download(key, dest_dir, resume=resume), keys, max_workers)
+
+    def delete_many(self, keys: Iterable[str], max_workers: int = None) -> Iterator[Tuple[str, dict]]:
+        """Deletes many files in parallel for authorized user
+
+        Example:
+            keys = [node['key'] for node in fileio.list()['nodes']]
+            failed = [key for key, result in fileio.delete_many(keys) if not result['success']]
+
+        Args:
+            keys: Iterable of keys of files
+            max_workers: Number of threads. Use max_workers of instance if not assigned
 
+        Return:
+            Iterator of (key, result dict of delete) in completion order
+        """
+        return self.__map_completed(self.delete, keys, max_workers)
+
+    def update_many(self, keys: Iterable[str], expires: Union[str, datetime, timedelta] = '__default',
+                    max_downloads: int = '__default', auto_delete: bool = '__default',
+                    max_workers: int = None) -> Iterator[Tuple[str, dict]]:
+        """Updates properties of many files in parallel for authorized user
+
+        Example:
+            for key, result in fileio.update_many(keys, expires='1w'):
+                print(key, result['expires'])
+
+        Args:
+            keys: Iterable of keys of files
+            expires, max_downloads, auto_delete: Same as update, applied to every file
+            max_workers: Number of threads. Use max_workers of instance if not assigned
+
+        Return:
+            Iterator of (key, result of update) in completion order
+        """
+        return self.__map_completed(lambda key: self.update(key, expires=expires, max_downloads=max_downloads,
+                                                            auto_delete=auto_delete), keys, max_workers)
+
+    @class_or_instancemethod
+    def upload_tree(self, path: str, shards: int = 1, expires: Union[str, datetime, timedelta] = '__default',
+                    max_downloads: int = '__default', auto_delete: bool = '__default',
+                    compress: Literal['gzip', 'zstd', 'lz4'] = None, level: int = None,
+                    max_workers: int = None) -> dict:
+        """Uploads a directory tree as tar archives without temp files
+
+        Tree is packed into a tar stream on a worker thread while the stream is being uploaded.
+        With shards, files are split into that many archives of about the same size, uploaded in parallel.
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
+            manifest = fileio.upload_tree('build/', shards=4, compress='gzip')
+            with open('build.manifest.json', 'w') as f:
+                json.dump(manifest, f)
+            print(manifest['files']['bin/app'])  # key of archive containing build/bin/app
+
+        Args:
+            path: Directory to upload
+            shards: Number of archives to split tree into
+            expires, max_downloads, auto_delete, compress, level: Same as upload, applied to every archive
+            max_workers: Number of threads. Use max_workers of class or instance if not assigned
+
+        Return:
+            Manifest dict, JSON serializable and accepted by download_tree
+            'success': bool. True if every archive is uploaded
+            'status': int. Status of first failed upload, or of last upload if every upload succeeded
+            'name': str. Basename of directory
+            'files': dict. Relative path with '/' separators to key of archive containing it
+            'shards': list of upload result of each archive, with 'files': list of relative paths in archive
+        """
+        name = os.path.basename(os.path.abspath(path))
+        groups = _tree._balance(_tree._walk(path), shards)
+
+        def upload(index):
+            source = _pipe_from(lambda pipe: _tree._write_tar(pipe, groups[index]), chunk_size=self.chunk_size)
+            try:
+                return self.upload(source, expires=expires, max_downloads=max_downloads, auto_delete=auto_delete,
+                                   filename='{}.tar'.format(name) if len(groups) == 1 else '{}.{}.tar'.format(name, index),
+                                   compress=compress, level=level)
+            finally:
+                source.close()
+
+        results = sorted(self.__map_completed(upload, range(len(groups)), max_workers), key=lambda item: item[0])
+        # Plain dicts, so manifest can be serialized with json
+        results = [dict(resp, files=[relpath for relpath, _, _ in groups[index]]) for index, resp in results]
+        failed = [resp for resp in results if not resp['success']]
+        return {
+            'success': not failed,
+            'status': failed[0]['status'] if failed else results[-1]['status'],
+            'name': name,
+            'files': {relpath: resp.get('key') for resp in results for relpath in resp['files']},
+            'shards': results,
+        }
+
+    @class_or_instancemethod
+    def download_tree(self, manifest: dict, dest: str = '.', max_workers: int = None) -> dict:
+        """Downloads a directory tree uploaded by upload_tree
+
+        Archives are downloaded in parallel and extracted while being streamed, without temp files.
+        Members that would be extracted outside of dest are refused.
+
+        Example:
+            with open('build.manifest.json') as f:
+                ret_json = Fileio.download_tree(json.load(f), 'restored/')
+
+        Args:
+            manifest: Manifest returned by upload_tree
+            dest: Directory to extract tree into, created if not existed
+            max_workers: Number of threads. Use max_workers of class or instance if not assigned
+
+        Return:
+            A dict of result status
+            'success': bool. True if every archive is extracted
+            'status': int. Status of first failed download, or 200 if every download succeeded
+            'path': str. Absolute path of dest
+            'files': list of extracted relative paths
+            'shards': list of download result of each archive, with 'files': list of relative paths extracted
+        """
+        os.makedirs(dest, exist_ok=True)
+
+        def extract(index):
+            key = manifest['shards'][index]['key']
+            try:
+                with self.open_download(key) as f:
+                    files = _tree._extract_tar(f, dest)
+            except FileioError as e:
+                return e.result
+            return {
+                'success': True,
+                'status': 200,
+                'key': key,
+                'files': files,
+            }
+
+        results = sorted(self.__map_completed(extract, range(len(manifest['shards'])), max_workers),
+                         key=lambda item: item[0])
+        results = [resp for _, resp in results]
+        failed = [resp for resp in results if not resp['success']]
+        return {
+            'success': not failed,
+            'status': failed[0]['status'] if failed else 200,
+            'path': os.path.abspath(dest),
+            'files': sorted(relpath for resp in results for relpath in resp.get('files', [])),
+            'shards': results,
+        }
@@ -0,0 +1,104 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, List
+
+
+class UploadJournal(object):
+    def __init__(self, path: str = ':memory:') -> None:
+        """Constructor of UploadJournal Class
+
+        Checkpoint journal of a batch upload job, so a restarted job skips files already uploaded
+        A file is journaled as started before its upload and as completed with its result after it
+        File changed since its upload, by size or mtime, is uploaded again
+        Notice that file.io has no resumable upload protocol, so a file whose upload was interrupted is uploaded
+        again from its first byte
+
+        Example:
+            journal = UploadJournal('nightly_upload.db')
+            for path, result in fileio.upload_many(glob.glob('logs/*.log'), journal=journal):
+                print(path, result['key'])
+            journal.clear()  # job finished, next run uploads everything again
+
+        Args:
+            path: SQLite file to keep journal in. Default keeps journal in memory only
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS uploads '
+                         '(path TEXT, options TEXT, size INTEGER, mtime_ns INTEGER, state TEXT, result TEXT, '
+                         'updated REAL, PRIMARY KEY (path, options))')
+        self._db.commit()
+
+    def lookup(self, path: str, options: str) -> Optional[dict]:
+        """Get result of completed upload of file with same options, None if file is not uploaded or changed since"""
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._db.execute('SELECT size, mtime_ns, result FROM uploads '
+                                   'WHERE path = ? AND options = ? AND state = ?',
+                                   (path, options, 'completed')).fetchone()
+        if row is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if row[0] != st.st_size or row[1] != st.st_mtime_ns:
+            return None
+        return json.loads(row[2])
+
+    def begin(self, path: str, options: str) -> None:
+        """Journal upload of file as started"""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (path, options, st.st_size, st.st_mtime_ns, 'started', None, time.time()))
+            self._db.commit()
+
+    def complete(self, path: str, options: str, result: dict) -> None:
+        """Journal upload of file as completed with its result"""
+        with self._lock:
+            self._db.execute('UPDATE uploads SET state = ?, result = ?, updated = ? WHERE path = ? AND options = ?',
+                             ('completed', json.dumps(result), time.time(), os.path.abspath(path), options))
+            self._db.commit()
+
+    def pending(self) -> List[str]:
+        """Get paths of files whose upload was started but not completed"""
+        with self._lock:
+            rows = self._db.execute('SELECT DISTINCT path FROM uploads WHERE state = ?', ('started',)).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self) -> None:
+        """Drop every journaled upload"""
+        with self._lock:
+            self._db.execute('DELETE FROM uploads')
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close SQLite file"""
+        with self._lock:
+            self._db.close()
+
+
+def _load_checkpoint(path: str, key: str) -> dict:
+    """Load checkpoint of a partial download, empty dict if there is none for key"""
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return checkpoint if isinstance(checkpoint, dict) and checkpoint.get('key') == key else {}
+
+
+def _save_checkpoint(path: str, checkpoint: dict) -> None:
+    """Save checkpoint of a partial download atomically, so a crash leaves either the old or the new one"""
+    temp = path + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
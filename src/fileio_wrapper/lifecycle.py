@@ -0,0 +1,185 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Literal, Optional, Union
+
+_ACTIONS = ('extend', 'delete')
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(expires) -> Optional[float]:
+    """Parse expires field of file.io into a POSIX timestamp, None for no expires or unknown format"""
+    if isinstance(expires, datetime):
+        return expires.timestamp()
+    try:
+        return datetime.fromisoformat(expires.replace('Z', '+00:00')).timestamp() if expires else None
+    except (AttributeError, ValueError):
+        return None
+
+
+class LifecycleManager(object):
+    def __init__(self, action: Literal['extend', 'delete'] = 'extend', lead_time: float = 3600,
+                 extend_by: Union[str, timedelta] = '1d', batch_window: float = 60, max_batch: int = 100,
+                 max_workers: int = None, callback: Callable[[str, str, dict], None] = None) -> None:
+        """Constructor of LifecycleManager Class
+
+        Keep expiry of hosted files in a local heap, and extend or delete files shortly before they expire
+        Heap is seeded by listing the account once on attach, then kept up to date by upload, update and delete
+        of the attached instance, so the account is never listed again
+        A single scheduler thread sleeps until the earliest file is due, then takes every file due within
+        batch_window too, and runs them as one burst of update_many or delete_many within rate_limit of instance
+        Notice that files downloaded max_downloads times are removed by file.io without notice,
+        their actions just fail and are reported to callback
+        Exceptions raised by callback or by a burst are logged to logger 'fileio_wrapper.lifecycle',
+        and the scheduler thread goes on with the next burst
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX', rate_limit=3)
+            lifecycle = LifecycleManager(lead_time=600, extend_by='1d').attach(fileio)
+            result = fileio.upload('report.pdf', expires='1h')  # extended by a day 10 minutes before expiry
+            lifecycle.track(fileio.upload('tmp.bin', expires='1h'), action='delete')  # deleted instead
+            lifecycle.close()
+
+        Args:
+            action: Default action of tracked files
+                'extend' updates expires of file to extend_by from the moment it runs
+                'delete' deletes file, e.g. files uploaded with auto_delete False that would otherwise keep storage
+            lead_time: Seconds before expiry to run action
+            extend_by: Expires set by 'extend', count-down format or timedelta, same as expires of update
+            batch_window: Seconds ahead of the earliest due file to coalesce into the same burst
+            max_batch: Max files of one burst
+            max_workers: Number of threads of a burst. Use max_workers of instance if not assigned
+            callback: Called with key, action and result dict of every action run, from the scheduler thread
+        """
+        if action not in _ACTIONS:
+            raise ValueError('Unknown action {!r}, choose one of {}'.format(action, ', '.join(_ACTIONS)))
+        self.action = action
+        self.lead_time = lead_time
+        self.extend_by = extend_by
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_workers = max_workers
+        self.callback = callback
+        self.fileio = None
+        self._heap = []
+        self._index = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def attach(self, fileio, seed: bool = True) -> 'LifecycleManager':
+        """Start managing files of a Fileio instance
+
+        Args:
+            fileio: Fileio instance, auth is needed to update and delete files
+            seed: Whether to track every file of account by listing it once. False to track new uploads only
+        """
+        self.fileio = fileio
+        fileio.lifecycle = self
+        if seed:
+            for node in fileio.iter_files():
+                self.track(node)
+        self._thread = threading.Thread(target=self.__run, name='fileio-lifecycle', daemon=True)
+        self._thread.start()
+        return self
+
+    def track(self, result: dict, action: Literal['extend', 'delete'] = None) -> None:
+        """Track a file by its upload, update or list result, with 'key' and 'expires'
+
+        Files without expires are not tracked. Tracking a file again reschedules it,
+        keeping its action unless action is assigned
+        """
+        if action is not None and action not in _ACTIONS:
+            raise ValueError('Unknown action {!r}, choose one of {}'.format(action, ', '.join(_ACTIONS)))
+        key, expires = result.get('key'), _timestamp(result.get('expires'))
+        if not key:
+            return
+        with self._cond:
+            if expires is None:
+                self._index.pop(key, None)
+                return
+            previous = self._index.get(key)
+            action = action or (previous[1] if previous else self.action)
+            self._index[key] = (expires, action)
+            # Entry replaced above stays in heap, and is skipped when popped
+            heapq.heappush(self._heap, (expires - self.lead_time, key))
+            self._cond.notify()
+
+    def forget(self, key: str) -> None:
+        """Stop tracking a file, e.g. after it is deleted"""
+        with self._cond:
+            self._index.pop(key, None)
+
+    def schedule(self) -> list:
+        """Get tracked files as list of (due time, key, action), earliest first"""
+        with self._cond:
+            return sorted((datetime.fromtimestamp(expires - self.lead_time), key, action)
+                          for key, (expires, action) in self._index.items())
+
+    def __pop_due(self, now: float) -> Optional[list]:
+        """Pop files due within batch_window of now, None if the earliest file is not due yet"""
+        while self._heap and self.__stale(self._heap[0]):
+            heapq.heappop(self._heap)
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        batch = []
+        while self._heap and self._heap[0][0] <= now + self.batch_window and len(batch) < self.max_batch:
+            entry = heapq.heappop(self._heap)
+            if not self.__stale(entry):
+                batch.append((entry[1], self._index.pop(entry[1])[1]))
+        return batch
+
+    def __stale(self, entry: tuple) -> bool:
+        tracked = self._index.get(entry[1])
+        return tracked is None or tracked[0] - self.lead_time != entry[0]
+
+    def __run(self) -> None:
+        while True:
+            with self._cond:
+                batch = None
+                while not self._closed:
+                    batch = self.__pop_due(time.time())
+                    if batch is not None:
+                        break
+                    self._cond.wait(self._heap[0][0] - time.time() if self._heap else None)
+                if self._closed:
+                    return
+            try:
+                self.__burst(batch)
+            except Exception:
+                logger.exception('Lifecycle burst of %d files failed, they are no longer tracked: %s',
+                                 len(batch), ', '.join(key for key, _ in batch))
+
+    def __burst(self, batch: list) -> None:
+        """Run actions of a batch, one call of update_many and one of delete_many"""
+        extends = [key for key, action in batch if action == 'extend']
+        deletes = [key for key, action in batch if action == 'delete']
+        results = []
+        if extends:
+            results += [(key, 'extend', result) for key, result in
+                        self.fileio.update_many(extends, expires=self.extend_by, max_workers=self.max_workers)]
+        if deletes:
+            results += [(key, 'delete', result) for key, result in
+                        self.fileio.delete_many(deletes, max_workers=self.max_workers)]
+        for key, action, result in results:
+            if action == 'extend' and result.get('success'):
+                # Reschedule at new expires, keeping action even if it is not the default one
+                self.track(result, action='extend')
+            if self.callback:
+                try:
+                    self.callback(key, action, result)
+                except Exception:
+                    logger.exception('Lifecycle callback failed on %s of %s', action, key)
+
+    def close(self) -> None:
+        """Stop scheduler thread and detach from instance. Files not due yet are left as they are"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+        if self.fileio is not None and self.fileio.lifecycle is self:
+            self.fileio.lifecycle = None
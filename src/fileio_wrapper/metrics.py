@@ -0,0 +1,124 @@
+import bisect
+import threading
+from typing import Iterable
+
+
+class MetricsCollector(object):
+    def __init__(self, buckets: Iterable[float] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)) -> None:
+        """Constructor of MetricsCollector Class
+
+        Aggregate request events of Fileio into latency histograms and throughput per method,
+        ready to be exported to a metrics stack
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX')
+            metrics = MetricsCollector().attach(fileio)
+            fileio.upload('myfile.txt')
+            print(metrics.snapshot()['POST']['latency']['p99'])
+
+        Args:
+            buckets: Upper bounds in seconds of latency histogram buckets, an overflow bucket is always added
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def attach(self, fileio) -> 'MetricsCollector':
+        """Start collecting events of a Fileio class or instance"""
+        fileio.add_hook('request_end', self.record)
+        fileio.add_hook('retry', self.record_retry)
+        return self
+
+    def detach(self, fileio) -> None:
+        """Stop collecting events of a Fileio class or instance"""
+        fileio.remove_hook('request_end', self.record)
+        fileio.remove_hook('retry', self.record_retry)
+
+    def __method(self, method: str) -> dict:
+        if method not in self._stats:
+            self._stats[method] = {
+                'count': 0,
+                'errors': 0,
+                'retries': 0,
+                'histogram': [0] * (len(self.buckets) + 1),
+                'total': 0.0,
+                'connect': 0.0,
+                'dns': 0.0,
+                'tls': 0.0,
+                'ttfb': 0.0,
+                'send': 0.0,
+                'transfer': 0.0,
+                'bytes_sent': 0,
+                'bytes_received': 0,
+            }
+        return self._stats[method]
+
+    def record(self, info: dict) -> None:
+        """Record a finished request, hook of 'request_end'"""
+        with self._lock:
+            stats = self.__method(info['method'])
+            stats['count'] += 1
+            if info['error'] or not info['status'] or info['status'] >= 400:
+                stats['errors'] += 1
+            stats['histogram'][bisect.bisect_left(self.buckets, info['total'])] += 1
+            for key in ('total', 'connect', 'ttfb', 'send', 'transfer', 'bytes_sent', 'bytes_received'):
+                stats[key] += info[key]
+            for key in ('dns', 'tls'):
+                stats[key] += info.get(key, 0.0)
+
+    def record_retry(self, info: dict) -> None:
+        """Record a retry, hook of 'retry'"""
+        with self._lock:
+            self.__method(info['method'])['retries'] += 1
+
+    def __percentile(self, histogram: list, count: int, q: float) -> float:
+        rank, seen = q * count, 0
+        for index, n in enumerate(histogram):
+            seen += n
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+    def snapshot(self) -> dict:
+        """Get aggregated metrics
+
+        Return:
+            Dict keyed by method name, each value has keys
+                'count', 'errors', 'retries', 'bytes_sent', 'bytes_received',
+                'send_bytes_per_second', 'receive_bytes_per_second',
+                'latency': dict with 'buckets' (list of (upper bound, count)), 'sum', 'mean', 'p50', 'p90', 'p99',
+                'mean_connect', 'mean_dns', 'mean_tls', 'mean_ttfb', 'mean_transfer'
+        """
+        with self._lock:
+            result = {}
+            for method, stats in self._stats.items():
+                count = stats['count'] or 1
+                result[method] = {
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'bytes_sent': stats['bytes_sent'],
+                    'bytes_received': stats['bytes_received'],
+                    'send_bytes_per_second': stats['bytes_sent'] / stats['send'] if stats['send'] else 0.0,
+                    'receive_bytes_per_second':
+                        stats['bytes_received'] / stats['transfer'] if stats['transfer'] else 0.0,
+                    'latency': {
+                        'buckets': list(zip(self.buckets + (float('inf'),), stats['histogram'])),
+                        'sum': stats['total'],
+                        'mean': stats['total'] / count,
+                        'p50': self.__percentile(stats['histogram'], stats['count'], 0.5),
+                        'p90': self.__percentile(stats['histogram'], stats['count'], 0.9),
+                        'p99': self.__percentile(stats['histogram'], stats['count'], 0.99),
+                    },
+                    'mean_connect': stats['connect'] / count,
+                    'mean_dns': stats['dns'] / count,
+                    'mean_tls': stats['tls'] / count,
+                    'mean_ttfb': stats['ttfb'] / count,
+                    'mean_transfer': stats['transfer'] / count,
+                }
+            return result
+
+    def reset(self) -> None:
+        """Drop every recorded metric"""
+        with self._lock:
+            self._stats = {}
@@ -0,0 +1,413 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+
+class MockFileioServer(object):
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, bandwidth: float = None,
+                 rate_limit_every: int = 0, rate_limit_probability: float = 0.0, retry_after: float = 0.1,
+                 honour_range: bool = True, range_length: bool = True, max_limit: int = None,
+                 drop_after: int = None) -> None:
+        """Constructor of MockFileioServer Class
+
+        Local stand-in of file.io for offline tests and benchmarks
+        Upload, list, me, download (with Range), update (PUT/PATCH) and delete behave like file.io,
+        including expires, maxDownloads and autoDelete. Any Bearer token is accepted as an account.
+
+        Example:
+            with MockFileioServer(latency=0.01) as server:
+                fileio = Fileio('any-api-key')
+                fileio.url = server.url
+                fileio.upload('myfile.txt')
+
+        Args:
+            host: Host to listen on
+            port: Port to listen on, 0 for a free port
+            latency: Seconds to wait before every response
+            bandwidth: Max bytes per second of every request and response body, None for no limit
+            rate_limit_every: Answer every Nth request with 429 Too Many Requests, 0 to disable
+            rate_limit_probability: Probability to answer a request with 429 Too Many Requests
+            retry_after: Seconds in Retry-After header of 429 responses
+            honour_range: Whether to answer Range requests with 206 Partial Content
+            range_length: Whether to send complete length in Content-Range of 206 responses, '*' if not
+            max_limit: Max items of a list page whatever limit is asked, None for no cap
+            drop_after: Close connection after this many bytes of a response body, None to send whole body
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.honour_range = honour_range
+        self.range_length = range_length
+        self.max_limit = max_limit
+        self.drop_after = drop_after
+        self.files = {}
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), type('Handler', (_Handler,), {'server_state': self}))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return 'http://{}:{}/'.format(host, port)
+
+    def start(self) -> 'MockFileioServer':
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in current thread"""
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'MockFileioServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def _iso(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + '{:03d}Z'.format(moment.microsecond // 1000)
+
+
+def _parse_expires(value: str) -> Optional[datetime]:
+    """Parse expires field the way file.io does, ISO 8601 or count-down format, None for no expires"""
+    now = datetime.now(timezone.utc)
+    if value is None:
+        return now + timedelta(days=14)
+    if value == '':
+        return None
+    match = re.match(r'^([1-9][0-9]*)([yQMwdhms])$', value)
+    if match:
+        seconds = {'y': 365 * 86400, 'Q': 91 * 86400, 'M': 30 * 86400, 'w': 7 * 86400, 'd': 86400, 'h': 3600,
+                   'm': 60, 's': 1}[match.group(2)]
+        return now + timedelta(seconds=int(match.group(1)) * seconds)
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return moment if moment.tzinfo else moment.astimezone(timezone.utc)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server_state = None
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def handle(self) -> None:
+        try:
+            super().handle()
+        except ConnectionError:
+            # Client closed connection in the middle of a body, e.g. an aborted download
+            pass
+
+    # Transport
+
+    def _read_body(self) -> bytes:
+        bandwidth = self.server_state.bandwidth
+        length = self.headers.get('Content-Length')
+        chunks = []
+        if length is not None:
+            remaining = int(length)
+            while remaining:
+                chunk = self.rfile.read(min(remaining, 64 * 1024))
+                if not chunk:
+                    # Client went away before the whole body, drop the request as file.io does
+                    raise ConnectionAbortedError('Body ended at {} of {} bytes'.format(int(length) - remaining, length))
+                remaining -= len(chunk)
+                chunks.append(chunk)
+                if bandwidth:
+                    time.sleep(len(chunk) / bandwidth)
+        elif self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    raise ConnectionAbortedError('Chunked body ended without last chunk')
+                size = int(line.split(b';')[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                if bandwidth:
+                    time.sleep(size / bandwidth)
+        return b''.join(chunks)
+
+    def _send(self, status: int, body=b'', content_type: str = 'application/json', headers: dict = None) -> None:
+        if isinstance(body, dict):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        bandwidth = self.server_state.bandwidth
+        drop_after = self.server_state.drop_after
+        view = memoryview(body)[:drop_after]
+        step = 64 * 1024
+        for offset in range(0, len(view), step):
+            self.wfile.write(view[offset:offset + step])
+            if bandwidth:
+                time.sleep(len(view[offset:offset + step]) / bandwidth)
+        if len(view) < len(body):
+            self.close_connection = True
+
+    def _error(self, status: int, code: str, message: str, key: str = None) -> None:
+        self._send(status, {'success': False, 'status': status, 'code': code, 'message': message, 'key': key})
+
+    # Request handling
+
+    def _handle(self, method: str) -> None:
+        state = self.server_state
+        body = self._read_body() if method in ('POST', 'PUT', 'PATCH') else b''
+        with state.lock:
+            state.request_count += 1
+            count = state.request_count
+        if state.latency:
+            time.sleep(state.latency)
+        if (state.rate_limit_every and count % state.rate_limit_every == 0) or \
+                (state.rate_limit_probability and random.random() < state.rate_limit_probability):
+            self._send(429, {'success': False, 'status': 429, 'code': 'TOO_MANY_REQUESTS',
+                             'message': 'Too many requests'}, headers={'Retry-After': str(state.retry_after)})
+            return
+
+        auth = self.headers.get('Authorization', '')
+        account = auth[len('Bearer '):] if auth.startswith('Bearer ') and auth[len('Bearer '):] != 'None' else None
+        url = urlparse(self.path)
+        path = url.path.strip('/')
+        queries = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if method == 'POST' and not path:
+            self._upload(account, body)
+        elif method == 'GET' and path == 'me':
+            self._me(account)
+        elif method == 'GET' and not path:
+            self._list(account, queries)
+        elif method == 'GET':
+            self._download(path)
+        elif method in ('PUT', 'PATCH'):
+            self._update(account, path, body, method == 'PUT')
+        elif method == 'DELETE':
+            self._delete(account, path)
+        else:
+            self._error(405, 'METHOD_NOT_ALLOWED', 'Method not allowed')
+
+    def do_GET(self) -> None:
+        self._handle('GET')
+
+    def do_POST(self) -> None:
+        self._handle('POST')
+
+    def do_PUT(self) -> None:
+        self._handle('PUT')
+
+    def do_PATCH(self) -> None:
+        self._handle('PATCH')
+
+    def do_DELETE(self) -> None:
+        self._handle('DELETE')
+
+    # API
+
+    def _parse_form(self, body: bytes) -> dict:
+        match = re.search('boundary=([^;]+)', self.headers.get('Content-Type', ''))
+        if not match:
+            return {}
+        form = {}
+        for part in body.split(b'--' + match.group(1).strip('"').encode('latin-1')):
+            if part in (b'', b'--\r\n', b'--') or b'\r\n\r\n' not in part:
+                continue
+            head, data = part.split(b'\r\n\r\n', 1)
+            head = head.decode('utf-8')
+            name = re.search('name="([^"]*)"', head).group(1)
+            filename = re.search('filename="([^"]*)"', head)
+            data = data[:-2] if data.endswith(b'\r\n') else data
+            form[name] = (filename.group(1), data) if filename else data.decode('utf-8')
+        return form
+
+    def _apply_form(self, node: dict, form: dict, replace_all: bool) -> None:
+        if 'file' in form or replace_all:
+            name, content = form.get('file', ('file', b''))
+            node['name'] = name
+            node['content'] = content
+            node['size'] = len(content)
+        if 'expires' in form or replace_all:
+            node['expires'] = _parse_expires(form.get('expires'))
+        if 'maxDownloads' in form or replace_all:
+            # Empty value means no limit, missing value means default
+            node['maxDownloads'] = int(form['maxDownloads']) if form.get('maxDownloads') else \
+                0 if 'maxDownloads' in form else 1
+        if 'autoDelete' in form or replace_all:
+            node['autoDelete'] = form.get('autoDelete', 'true') != 'false'
+        node['modified'] = datetime.now(timezone.utc)
+
+    def _node(self, node: dict) -> dict:
+        return {
+            'id': node['id'],
+            'key': node['key'],
+            'path': '/',
+            'nodeType': 'file',
+            'name': node['name'],
+            'title': None,
+            'description': None,
+            'size': node['size'],
+            'link': self.server_state.url + node['key'],
+            'private': False,
+            'expires': _iso(node['expires']) if node['expires'] else None,
+            'downloads': node['downloads'],
+            'maxDownloads': node['maxDownloads'],
+            'autoDelete': node['autoDelete'],
+            'planId': 0,
+            'screeningStatus': 'pending',
+            'mimeType': 'application/octet-stream',
+            'created': _iso(node['created']),
+            'modified': _iso(node['modified']),
+        }
+
+    def _find(self, key: str) -> Optional[dict]:
+        node = self.server_state.files.get(key)
+        if node and node['expires'] and node['expires'] < datetime.now(timezone.utc):
+            self.server_state.files.pop(key, None)
+            return None
+        return node
+
+    def _upload(self, account: str, body: bytes) -> None:
+        form = self._parse_form(body)
+        if 'file' not in form or not form['file'][1]:
+            self._error(400, 'BAD_REQUEST', 'File is empty or missing')
+            return
+        now = datetime.now(timezone.utc)
+        key = uuid.uuid4().hex[:12]
+        node = {'id': str(uuid.uuid4()), 'key': key, 'account': account, 'downloads': 0, 'created': now}
+        self._apply_form(node, form, True)
+        with self.server_state.lock:
+            self.server_state.files[key] = node
+        self._send(200, dict(self._node(node), success=True, status=200))
+
+    def _me(self, account: str) -> None:
+        if not account:
+            self._error(401, 'UNAUTHORIZED', 'Authentication required')
+            return
+        with self.server_state.lock:
+            used = sum(node['size'] for node in self.server_state.files.values() if node['account'] == account)
+        self._send(200, {
+            'success': True,
+            'status': 200,
+            'id': account,
+            'planId': 0,
+            'maxStorageBytes': 4 * 1024 ** 4,
+            'usedStorageBytes': used,
+            'maxUploadSize': 4 * 1024 ** 3,
+            'directDownload': 0,
+            'rateLimit': 3,
+        })
+
+    def _list(self, account: str, queries: dict) -> None:
+        if not account:
+            self._error(401, 'UNAUTHORIZED', 'Authentication required')
+            return
+        with self.server_state.lock:
+            nodes = [self._node(node) for key, node in list(self.server_state.files.items())
+                     if node['account'] == account and self._find(key)]
+        if queries.get('search'):
+            nodes = [node for node in nodes if queries['search'] in node['name']]
+        if queries.get('sort'):
+            field = queries['sort'].lstrip('-')
+            nodes.sort(key=lambda node: (node.get(field) is None, node.get(field) or 0),
+                       reverse=queries['sort'].startswith('-'))
+        count = len(nodes)
+        offset = int(queries.get('offset') or 0)
+        limit = int(queries['limit']) if queries.get('limit') else None
+        if self.server_state.max_limit is not None:
+            limit = min(limit or self.server_state.max_limit, self.server_state.max_limit)
+        nodes = nodes[offset:offset + limit if limit is not None else None]
+        self._send(200, {'success': True, 'status': 200, 'nodes': nodes, 'count': count})
+
+    def _download(self, key: str) -> None:
+        with self.server_state.lock:
+            node = self._find(key)
+            if node is None:
+                self._error(404, 'NOT_FOUND', 'File not found', key)
+                return
+            content = node['content']
+            node['downloads'] += 1
+            if node['autoDelete'] and node['maxDownloads'] and node['downloads'] >= node['maxDownloads']:
+                self.server_state.files.pop(key, None)
+        headers = {'Content-Disposition': 'attachment; filename={}'.format(node['name']), 'Accept-Ranges': 'bytes'}
+        match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+        if match and self.server_state.honour_range:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else len(content) - 1, len(content) - 1)
+            if start >= len(content):
+                self._send(416, b'', headers={'Content-Range': 'bytes */{}'.format(len(content))})
+                return
+            headers['Content-Range'] = 'bytes {}-{}/{}'.format(
+                start, end, len(content) if self.server_state.range_length else '*')
+            self._send(206, content[start:end + 1], 'application/octet-stream', headers)
+            return
+        self._send(200, content, 'application/octet-stream', headers)
+
+    def _update(self, account: str, key: str, body: bytes, replace_all: bool) -> None:
+        form = self._parse_form(body)
+        with self.server_state.lock:
+            node = self._find(key)
+            if node is None or node['account'] != account:
+                self._error(404, 'NOT_FOUND', 'File not found', key)
+                return
+            if replace_all and not form.get('file', ('', b''))[1]:
+                self._error(400, 'BAD_REQUEST', 'File is empty or missing', key)
+                return
+            self._apply_form(node, form, replace_all)
+            result = dict(self._node(node), success=True, status=200)
+        self._send(200, result)
+
+    def _delete(self, account: str, key: str) -> None:
+        with self.server_state.lock:
+            node = self._find(key)
+            if node is None or node['account'] != account:
+                self._error(404, 'NOT_FOUND', 'File not found', key)
+                return
+            del self.server_state.files[key]
+        self._send(200, b'')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Local stand-in of file.io for offline tests and benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before every response')
+    parser.add_argument('--bandwidth', type=float, default=None, help='max bytes per second of every body')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='answer every Nth request with 429')
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0, help='probability to answer 429')
+    parser.add_argument('--retry-after', type=float, default=0.1, help='seconds in Retry-After of 429')
+    parser.add_argument('--no-range', action='store_true', help='ignore Range requests')
+    args = parser.parse_args()
+    server = MockFileioServer(args.host, args.port, args.latency, args.bandwidth, args.rate_limit_every,
+                              args.rate_limit_probability, args.retry_after, not args.no_range)
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
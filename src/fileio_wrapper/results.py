@@ -0,0 +1,231 @@
+import re
+from collections.abc import MutableMapping
+
+
+def _snake(key: str) -> str:
+    return re.sub('([A-Z])', r'_\1', key).lower()
+
+
+def _plain(value):
+    """Convert results nested in value into plain dicts and lists"""
+    if isinstance(value, (_Result, FileNode)):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+class _Result(dict):
+    """Base of result types
+
+    Results are dicts with the JSON keys of file.io, e.g. resp['maxDownloads'], so code written against dict results,
+    isinstance checks and json.dumps keep working. Fields are also read as snake_case attributes,
+    e.g. resp.max_downloads, which is None if file.io did not return the field.
+    """
+    __slots__ = ()
+    _keys = ()
+    _fields = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._fields = {_snake(key): key for key in cls._keys}
+
+    def __init__(self, data: dict = None) -> None:
+        super().__init__(data or ())
+
+    def __getattr__(self, attr: str):
+        # Only called for attributes not found on the type, i.e. fields
+        key = self._fields.get(attr)
+        if key is None:
+            raise AttributeError('{!r} object has no attribute {!r}'.format(type(self).__name__, attr))
+        return self.get(key)
+
+    def __setattr__(self, attr: str, value) -> None:
+        key = self._fields.get(attr)
+        if key is None:
+            object.__setattr__(self, attr, value)
+        else:
+            self[key] = value
+
+    def __delattr__(self, attr: str) -> None:
+        key = self._fields.get(attr)
+        if key is None:
+            object.__delattr__(self, attr)
+        elif self.pop(key, self) is self:
+            raise AttributeError(attr)
+
+    def to_dict(self) -> dict:
+        """Get a copy of result as plain dict, with nested results converted too"""
+        return {key: _plain(value) for key, value in self.items()}
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(type(self).__name__, dict.__repr__(self))
+
+
+_NODE_KEYS = ('id', 'key', 'path', 'nodeType', 'name', 'title', 'description', 'size', 'link', 'private', 'expires',
+              'downloads', 'maxDownloads', 'autoDelete', 'planId', 'screeningStatus', 'mimeType', 'created',
+              'modified')
+_STATUS_KEYS = ('success', 'status', 'code', 'message')
+
+
+class FileNode(MutableMapping):
+    """Details of a hosted file, item of list()['nodes']
+
+    Fields returned by file.io live in __slots__ instead of a per-object dict, so a node takes less than half
+    the memory of the dict it is parsed from. They are read as snake_case attributes, e.g. node.max_downloads,
+    which is None if file.io did not return the field, or by the JSON keys of file.io, e.g. node['maxDownloads'].
+    Keys outside the known fields are kept in a dict created on demand.
+    A node is not a dict, use to_dict() to serialize it, or json.dumps(result, default=FileNode.to_dict)
+
+    Example:
+        for node in fileio.list()['nodes']:
+            print(node.key, node.name, node.size, node['maxDownloads'])
+    """
+    __slots__ = tuple(map(_snake, _NODE_KEYS)) + ('_extra',)
+    _attrs = {key: _snake(key) for key in _NODE_KEYS}
+    _attr_names = frozenset(_attrs.values())
+
+    def __init__(self, data: dict = None) -> None:
+        self._extra = None
+        if data:
+            for key, value in data.items():
+                self[key] = value
+
+    def __getattr__(self, attr: str):
+        # Only called for fields not returned by file.io
+        if attr in self._attr_names:
+            return None
+        raise AttributeError('{!r} object has no attribute {!r}'.format(type(self).__name__, attr))
+
+    def __getitem__(self, key: str):
+        attr = self._attrs.get(key)
+        if attr is not None:
+            try:
+                return object.__getattribute__(self, attr)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        attr = self._attrs.get(key)
+        if attr is not None:
+            object.__setattr__(self, attr, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        attr = self._attrs.get(key)
+        try:
+            if attr is not None:
+                object.__delattr__(self, attr)
+            else:
+                del self._extra[key]
+        except (AttributeError, KeyError, TypeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        for key in _NODE_KEYS:
+            if key in self:
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __eq__(self, other) -> bool:
+        return dict(self.items()) == (dict(other.items()) if isinstance(other, MutableMapping) else other)
+
+    def __reduce__(self):
+        # Rebuild from present keys only, default pickling would turn missing fields into None
+        return type(self), (dict(self.items()),)
+
+    def to_dict(self) -> dict:
+        """Get node as plain dict, e.g. to serialize it with json"""
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, self.to_dict())
+
+
+class UploadResult(_Result):
+    """Result of upload and update, details of the hosted file with 'success' and 'status'"""
+    __slots__ = ()
+    _keys = _STATUS_KEYS + _NODE_KEYS
+
+
+class AccountInfo(_Result):
+    """Result of me, plan and usage of account"""
+    __slots__ = ()
+    _keys = _STATUS_KEYS + ('id', 'planId', 'maxStorageBytes', 'usedStorageBytes', 'maxUploadSize', 'directDownload',
+                            'rateLimit')
+
+
+class DownloadResult(_Result):
+    """Result of download
+
+    Content, if downloaded into memory, is also exposed as a memoryview in attribute body,
+    so it can be sliced or handed to writers without copying
+    """
+    __slots__ = ()
+    _keys = _STATUS_KEYS + ('key', 'content', 'path', 'name', 'size', 'chunks', 'offset')
+
+    @property
+    def body(self) -> memoryview:
+        """Zero-copy view of content, None if file was saved to filepath"""
+        return memoryview(self.content) if self.content is not None else None
+
+
+class ListResult(_Result):
+    """Result of list
+
+    Nodes are kept as returned by file.io and replaced by FileNode objects one by one on first access,
+    so listing only to read 'count' costs nothing, and each parsed dict is freed as soon as its node is built.
+    Once nodes are read, serialize with to_dict() or json.dumps(result, default=FileNode.to_dict)
+    """
+    __slots__ = ('_parsed',)
+    _keys = _STATUS_KEYS + ('count', 'nodes')
+
+    def __init__(self, data: dict = None) -> None:
+        super().__init__(data)
+        nodes = super().get('nodes')
+        if isinstance(nodes, list):
+            # Own list, so nodes are replaced in place without touching the list of a shared or cached result
+            super().__setitem__('nodes', list(nodes))
+        self._parsed = False
+
+    def __getitem__(self, key: str):
+        if key == 'nodes':
+            self.__parse()
+        return super().__getitem__(key)
+
+    def get(self, key: str, default=None):
+        if key == 'nodes':
+            self.__parse()
+        return super().get(key, default)
+
+    def __setitem__(self, key: str, value) -> None:
+        super().__setitem__(key, value)
+        if key == 'nodes':
+            self._parsed = False
+
+    def __parse(self) -> None:
+        if getattr(self, '_parsed', True):
+            return
+        nodes = super().get('nodes')
+        if isinstance(nodes, list):
+            for index, node in enumerate(nodes):
+                if not isinstance(node, FileNode):
+                    nodes[index] = FileNode(node)
+        self._parsed = True
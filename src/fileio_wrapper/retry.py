@@ -0,0 +1,98 @@
+import random
+import time
+from typing import Iterable, Optional
+from ._lazy import _LazyModule
+
+email_utils = _LazyModule('email.utils')
+
+
+class RetryPolicy(object):
+    def __init__(self, max_attempts: int = 3, backoff: float = 0.5, max_backoff: float = 30.0, jitter: bool = True,
+                 statuses: Iterable[int] = (429, 500, 502, 503, 504),
+                 methods: Iterable[str] = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'),
+                 upload_statuses: Iterable[int] = (429, 503), retry_uploads: bool = True) -> None:
+        """Constructor of RetryPolicy Class
+
+        Decide whether a failed request should be sent again and how long to wait before it.
+        Idempotent methods are retried on connection errors and any status in statuses.
+        Uploads (POST, PATCH) are retried only if body can be replayed (path, bytes or seekable file object),
+        on statuses in upload_statuses, which mean file.io did not take the file, and on connection errors
+        before any byte of body was sent. A connection broken later may have been dropped after file.io
+        stored the file, so the upload is not sent again to avoid a duplicate file.
+
+        Example:
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX', retry=RetryPolicy(max_attempts=5, backoff=1))
+            fileio = Fileio('XXXXXXX.XXXXXX-XXXXXX-XXXXXX-XXXXXX', retry=None)  # never retry
+
+        Args:
+            max_attempts: Max number of attempts including the first one
+            backoff: Seconds to wait before second attempt, doubled on every next attempt
+            max_backoff: Max seconds to wait between attempts
+            jitter: Wait random seconds between 0 and backoff, so retries of many threads do not come in bursts
+            statuses: Status codes to retry idempotent methods on
+            methods: Idempotent method names
+            upload_statuses: Status codes to retry uploads on
+            retry_uploads: Whether to retry uploads at all
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(method.upper() for method in methods)
+        self.upload_statuses = frozenset(upload_statuses)
+        self.retry_uploads = retry_uploads
+
+    def should_retry(self, method: str, attempt: int, status: int = None, replayable: bool = True,
+                     sent: bool = True) -> bool:
+        """Whether to retry the request
+
+        Args:
+            method: Request method name
+            attempt: Number of attempts already made
+            status: Status code of response, None if request failed with connection error
+            replayable: Whether request body can be sent again
+            sent: Whether request may have reached the server before connection error. Ignored with status
+
+        Return:
+            True if request should be sent again
+        """
+        if attempt >= self.max_attempts or not replayable:
+            return False
+        if method.upper() in self.methods:
+            return status is None or status in self.statuses
+        if self.retry_uploads:
+            return not sent if status is None else status in self.upload_statuses
+        return False
+
+    def delay(self, attempt: int, retry_after: str = None) -> float:
+        """Seconds to wait before next attempt
+
+        Retry-After header is honoured if server sent one, in seconds or HTTP date format
+
+        Args:
+            attempt: Number of attempts already made
+            retry_after: Value of Retry-After header
+
+        Return:
+            Seconds to wait
+        """
+        seconds = self.parse_retry_after(retry_after)
+        if seconds is not None:
+            return min(seconds, self.max_backoff)
+        seconds = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, seconds) if self.jitter else seconds
+
+    @staticmethod
+    def parse_retry_after(retry_after: str = None) -> Optional[float]:
+        """Parse Retry-After header into seconds from now, None if header is missing or malformed"""
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email_utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            return None
@@ -0,0 +1,721 @@
+import array
+import asyncio
+import contextlib
+import email.utils
+import io
+import json
+import os
+import pathlib
+import pickle
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import unittest
+from unittest import mock
+from concurrent import futures
+from datetime import datetime, timedelta, timezone
+import requests
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+sys.path.insert(0, os.path.join(os.getcwd(), 'src'))
+if os.getenv("GITHUB_ACTIONS"):
+    from fileio_wrapper import Fileio, FileioError, DedupIndex, MetadataCache, MetricsCollector, RetryPolicy, UploadJournal
+    from fileio_wrapper import FileNode, ListResult, UploadResult, LifecycleManager, AsyncFileio
+    from fileio_wrapper.mock_server import MockFileioServer
+    from fileio_wrapper.cli import main
+else:
+    from src.fileio_wrapper import Fileio, FileioError, DedupIndex, MetadataCache, MetricsCollector, RetryPolicy, UploadJournal
+    from src.fileio_wrapper import FileNode, ListResult, UploadResult, LifecycleManager, AsyncFileio
+    from src.fileio_wrapper.mock_server import MockFileioServer
+    from src.fileio_wrapper.cli import main
+
+
+class TestFileioOffline(unittest.TestCase):
+    """Same API as test_fileio_wrapper, against a local stand-in of file.io, so no API key or network is needed"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockFileioServer().start()
+        cls.LocalFileio = type('LocalFileio', (Fileio,), {'url': cls.server.url})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.LocalFileio.close()
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.files.clear()
+        self.server.rate_limit_every = 0
+        self.server.honour_range = True
+        self.server.range_length = True
+        self.server.drop_after = None
+        self.fileio = self.LocalFileio('offline-api-key')
+        os.makedirs('./tt_offline', exist_ok=True)
+        with open('./tt_offline/a.txt', "w") as f:
+            f.write("Hello")
+
+    def tearDown(self):
+        self.fileio.close()
+        shutil.rmtree('./tt_offline')
+
+    def test_upload_download(self):
+        resp = self.LocalFileio.upload('./tt_offline/a.txt', expires='5m')
+        self.assertTrue(resp['success'])
+        self.assertEqual(b'Hello', self.LocalFileio.download(resp['key'])['content'])
+        self.assertFalse(self.LocalFileio.download(resp['key'])['success'])
+
+        resp = self.fileio.upload('./tt_offline/a.txt', max_downloads=2)
+        self.assertEqual('a.txt', self.fileio.download(resp['key'], './tt_offline/')['name'])
+        self.assertEqual(b'Hello', b''.join(self.fileio.iter_download(resp['key'], chunk_size=2)))
+
+    def test_broken_download(self):
+        content = os.urandom(300000)
+        key = self.fileio.upload(io.BytesIO(content), filename='big.bin', max_downloads=5)['key']
+        with open('./tt_offline/big.bin', 'wb') as f:
+            f.write(b'old')
+        self.server.drop_after = 100000
+        self.assertFalse(self.fileio.download(key, './tt_offline/big.bin', chunk_size=10000)['success'])
+        with open('./tt_offline/big.bin', 'rb') as f:
+            self.assertEqual(b'old', f.read())
+        self.assertEqual(['a.txt', 'big.bin'], sorted(os.listdir('./tt_offline')))
+
+        with self.fileio.open_download(key, chunk_size=10000) as f:
+            with self.assertRaises(FileioError) as raised:
+                f.read()
+        self.assertEqual('SERVICE_UNAVAILABLE', raised.exception.result['code'])
+        self.server.drop_after = None
+        with self.assertRaises(FileioError) as raised:
+            self.fileio.open_download('missing').read()
+        self.assertEqual('missing', raised.exception.result['key'])
+
+    def test_path_upload(self):
+        resp = self.fileio.upload(pathlib.Path('./tt_offline/a.txt'))
+        self.assertEqual(('a.txt', 5), (resp['name'], resp['size']))
+        with open('./tt_offline/b.txt', 'w') as f:
+            f.write('World!')
+        resp = self.fileio.update(resp['key'], pathlib.Path('./tt_offline/b.txt'))
+        self.assertEqual(('b.txt', 6), (resp['name'], resp['size']))
+        self.assertEqual(b'World!', self.fileio.download(resp['key'])['content'])
+        with self.assertRaises(TypeError):
+            self.fileio.upload(42)
+        resp = self.fileio.upload(b'Hello', filename='a"b\r\nContent-Type: text/html\r\n\r\n.txt')
+        self.assertEqual(('a%22b%0D%0AContent-Type: text/html%0D%0A%0D%0A.txt', 5), (resp['name'], resp['size']))
+        with self.assertRaises(TypeError):
+            self.fileio.upload(42, compress='gzip')
+
+    def test_streaming_upload(self):
+        resp = self.fileio.upload((chunk for chunk in [b'Hel', b'lo']), filename='gen.txt')
+        self.assertTrue(resp['success'])
+        self.assertEqual(5, resp['size'])
+        resp = self.fileio.upload(io.BytesIO(b'Hello'), filename='bytes.txt')
+        with self.fileio.open_download(resp['key']) as f:
+            self.assertEqual(b'Hello', f.read())
+
+    def test_buffer_upload(self):
+        content = os.urandom(200000)
+        for source in (bytearray(content), memoryview(content), memoryview(array.array('i', content))):
+            resp = self.fileio.upload(source, filename='buffer.bin', max_downloads=2)
+            self.assertEqual(len(content), resp['size'])
+            self.assertEqual(content, self.fileio.download(resp['key'])['content'])
+
+        with open('./tt_offline/big.bin', 'wb') as f:
+            f.write(content)
+        self.fileio.mmap_threshold = 1024
+        self.server.rate_limit_every = 2
+        key = self.fileio.upload('./tt_offline/big.bin', max_downloads=2)['key']
+        self.assertEqual(content, self.fileio.download(key)['content'])
+        self.assertEqual(10, self.fileio.update(key, './tt_offline/big.bin', max_downloads=10)['maxDownloads'])
+
+    def test_single_flight(self):
+        content = os.urandom(100000)
+        key = self.fileio.upload(io.BytesIO(content), filename='shared.bin')['key']
+        requests_before = self.server.request_count
+        self.server.latency = 0.2
+        try:
+            with futures.ThreadPoolExecutor(max_workers=12) as executor:
+                paths = [None, './tt_offline/{}.bin'] * 4
+                downloads = [executor.submit(self.fileio.download, key, path and path.format(i))
+                             for i, path in enumerate(paths)]
+                accounts = [executor.submit(self.fileio.me) for _ in range(4)]
+                downloads = [future.result() for future in downloads]
+                accounts = [future.result() for future in accounts]
+        finally:
+            self.server.latency = 0.0
+        self.assertEqual(2, self.server.request_count - requests_before)
+        self.assertTrue(all(resp['success'] for resp in downloads + accounts))
+        self.assertEqual([content] * 4, [resp['content'] for resp in downloads[::2]])
+        for i in range(1, 8, 2):
+            with open('./tt_offline/{}.bin'.format(i), 'rb') as f:
+                self.assertEqual(content, f.read())
+
+        # Alone, download is written straight to filepath in chunks of chunk_size, without spool
+        key = self.fileio.upload(io.BytesIO(content), filename='alone.bin', max_downloads=2)['key']
+        received = []
+        hook = lambda info: received.append(info['bytes_received'])
+        self.fileio.add_hook('bytes_received', hook)
+        with mock.patch.object(sys.modules[Fileio.__module__], '_Spool', side_effect=AssertionError):
+            resp = self.fileio.download(key, './tt_offline/alone.bin', chunk_size=10000)
+        self.fileio.remove_hook('bytes_received', hook)
+        self.assertTrue(resp['success'])
+        self.assertLessEqual(max(b - a for a, b in zip([0] + received, received)), 10000)
+        with open('./tt_offline/alone.bin', 'rb') as f:
+            self.assertEqual(content, f.read())
+
+        self.fileio.single_flight = False
+        self.assertEqual(content, self.fileio.download(key)['content'])
+        self.assertFalse(self.fileio.download(key)['success'])
+
+    def test_transfer(self):
+        content = os.urandom(300000)
+        key = self.fileio.upload(io.BytesIO(content), filename='source.bin')['key']
+        other = self.LocalFileio('other-api-key')
+        try:
+            resp = self.fileio.transfer(key, target=other, max_downloads=2, buffer_size=16 * 1024)
+            self.assertTrue(resp['success'])
+            self.assertEqual(('source.bin', 300000, 2), (resp.name, resp.size, resp.max_downloads))
+            self.assertEqual([resp.key], [node.key for node in other.list()['nodes']])
+            self.assertEqual(content, other.download(resp.key)['content'])
+            self.assertFalse(self.fileio.transfer(key)['success'])
+
+            key = other.upload(io.BytesIO(content), filename='broken.bin')['key']
+            self.server.drop_after = 100000
+            self.assertFalse(other.transfer(key, target=self.fileio)['success'])
+            self.assertEqual(0, self.fileio.list()['count'])  # No partial copy is kept
+        finally:
+            other.close()
+
+    def test_list_me_update_delete(self):
+        key = self.fileio.upload('./tt_offline/a.txt')['key']
+        self.assertEqual(5, self.fileio.me()['usedStorageBytes'])
+        self.assertEqual([key], [node['key'] for node in self.fileio.list(search='a.txt')['nodes']])
+        self.assertEqual(10, self.fileio.update(key, max_downloads=10)['maxDownloads'])
+        self.assertTrue(self.fileio.delete(key)['success'])
+        self.assertEqual(0, self.fileio.list()['count'])
+
+    def test_results(self):
+        resp = self.fileio.upload('./tt_offline/a.txt', max_downloads=2)
+        self.assertIsInstance(resp, UploadResult)
+        self.assertEqual((resp['key'], 2), (resp.key, resp.max_downloads))
+        self.assertIsNone(FileNode({'key': resp.key}).size)
+        self.assertFalse(hasattr(resp, '__dict__'))
+        self.assertIsInstance(resp, dict)
+        self.assertEqual(resp, json.loads(json.dumps(resp)))
+        self.assertEqual(resp, pickle.loads(pickle.dumps(resp)))
+
+        listed = self.fileio.list()
+        nodes = listed['nodes']
+        self.assertIsInstance(nodes[0], FileNode)
+        self.assertEqual([resp.key], [node.key for node in nodes])
+        self.assertNotIsInstance(nodes[0], dict)
+        self.assertFalse(hasattr(nodes[0], '__dict__'))
+        self.assertEqual(resp.key, json.loads(json.dumps(listed, default=FileNode.to_dict))['nodes'][0]['key'])
+        self.assertEqual(resp.key, json.loads(json.dumps(listed.to_dict()))['nodes'][0]['key'])
+        self.assertEqual(listed, pickle.loads(pickle.dumps(listed)))
+        self.assertEqual(5, self.fileio.me().used_storage_bytes)
+
+        result = self.fileio.download(resp.key)
+        self.assertEqual(b'Hel', result.body[:3])
+        failed = self.fileio.download('missing')
+        self.assertFalse(failed.success)
+        self.assertNotIn('content', failed)
+        self.assertIsNone(failed.content)
+
+    def test_results_memory(self):
+        node = {key: 'value' for key in ('id', 'key', 'nodeType', 'name', 'link', 'expires', 'mimeType', 'created',
+                                         'modified', 'screeningStatus')}
+        node.update(size=5, downloads=0, maxDownloads=1, autoDelete=True, private=False, planId=0)
+        raw = json.dumps({'success': True, 'count': 20000, 'nodes': [dict(node, key=str(i)) for i in range(20000)]})
+        tracemalloc.start()
+        try:
+            data = json.loads(raw)
+            parsed = tracemalloc.get_traced_memory()[0]
+            listed = ListResult(data)
+            del data
+            self.assertEqual('19999', listed['nodes'][-1].key)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Nodes take less memory than the parsed dicts, which are freed one by one while nodes are built
+        self.assertLess(current, parsed * 0.8)
+        self.assertLess(peak, parsed * 1.1)
+
+    def test_iter_files(self):
+        keys = {self.fileio.upload(io.BytesIO(b'Hello'), filename='{}.txt'.format(i))['key'] for i in range(7)}
+        self.assertEqual(keys, {node['key'] for node in self.fileio.iter_files(page_size=3)})
+        self.server.max_limit = 2
+        try:
+            self.assertEqual(keys, {node['key'] for node in self.fileio.iter_files(page_size=3)})
+        finally:
+            self.server.max_limit = None
+
+    def test_batch(self):
+        results = list(self.fileio.upload_many(['./tt_offline/a.txt'] * 5 + ['./tt_offline/missing.txt']))
+        self.assertEqual(5, sum(resp['success'] for _, resp in results))
+        keys = [resp['key'] for _, resp in results if resp['success']]
+        self.assertTrue(all(resp['success'] for _, resp in self.fileio.download_many(keys[:2], './tt_offline')))
+        self.assertTrue(all(resp['success'] for _, resp in self.fileio.delete_many(keys[2:])))
+        self.assertEqual(0, self.fileio.list()['count'])
+
+    def test_retry_rate_limited(self):
+        self.server.rate_limit_every = 2
+        self.fileio.retry = RetryPolicy(max_attempts=3, backoff=0.01)
+        for _ in range(4):
+            self.assertTrue(self.fileio.upload('./tt_offline/a.txt')['success'])
+        self.server.rate_limit_every = 1
+        self.fileio.retry = None
+        self.assertEqual(429, self.fileio.me()['status'])
+
+    def test_retry_policy(self):
+        retry = RetryPolicy(max_attempts=3, backoff=1, max_backoff=10, jitter=False)
+        self.assertEqual(2.5, retry.parse_retry_after('2.5'))
+        self.assertEqual(0.0, retry.parse_retry_after('-1'))
+        later = email.utils.format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        self.assertAlmostEqual(30, retry.parse_retry_after(later), delta=2)
+        self.assertEqual(0.0, retry.parse_retry_after('Thu, 01 Jan 1970 00:00:00 GMT'))
+        self.assertIsNone(retry.parse_retry_after('soon'))
+        self.assertIsNone(retry.parse_retry_after(None))
+
+        # Retry-After is honoured up to max_backoff, backoff doubles without it
+        self.assertEqual(3.0, retry.delay(1, '3'))
+        self.assertEqual(10, retry.delay(1, later))
+        self.assertEqual([1, 2, 4, 8, 10], [retry.delay(attempt) for attempt in range(1, 6)])
+        self.assertTrue(retry.should_retry('GET', 2, 503))
+        self.assertFalse(retry.should_retry('GET', 3, 503))
+        self.assertFalse(retry.should_retry('POST', 1, 500))
+        self.assertFalse(retry.should_retry('POST', 1, 429, replayable=False))
+
+    def test_retry_connection_dropped(self):
+        # Server that reads the whole upload, then drops the connection without answering
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(8)
+        bodies = []
+
+        def serve():
+            while True:
+                try:
+                    conn, _ = listener.accept()
+                except OSError:
+                    return
+                with conn:
+                    data = b''
+                    while b'\r\n\r\n' not in data:
+                        data += conn.recv(65536)
+                    head, body = data.split(b'\r\n\r\n', 1)
+                    length = int(re.search(rb'(?i)content-length: *(\d+)', head).group(1))
+                    while len(body) < length:
+                        body += conn.recv(65536)
+                    bodies.append(body)
+
+        threading.Thread(target=serve, daemon=True).start()
+        url = 'http://127.0.0.1:{}/'.format(listener.getsockname()[1])
+        DroppingFileio = type('DroppingFileio', (Fileio,), {'url': url})
+        fileio = DroppingFileio('offline-api-key', retry=RetryPolicy(max_attempts=3, backoff=0.01))
+        try:
+            self.assertFalse(fileio.upload('./tt_offline/a.txt')['success'])
+            self.assertEqual(1, len(bodies))
+            self.assertTrue(fileio.retry.should_retry('POST', 1, None, sent=False))
+            self.assertTrue(fileio.retry.should_retry('GET', 1, None, sent=True))
+        finally:
+            fileio.close()
+            listener.close()
+
+    def test_cache(self):
+        self.fileio.cache = MetadataCache(ttl=60)
+        self.fileio.upload('./tt_offline/a.txt')
+        self.assertEqual(1, self.fileio.list()['count'])
+        count = self.server.request_count
+        self.fileio.list()
+        self.assertEqual(count, self.server.request_count)
+        self.fileio.upload('./tt_offline/a.txt')
+        self.assertEqual(2, self.fileio.list()['count'])
+
+        # Accounts sharing a cache never see results of each other
+        other = self.LocalFileio('other-api-key', cache=self.fileio.cache)
+        self.assertEqual(0, other.list()['count'])
+        self.assertEqual(2, self.fileio.list()['count'])
+        other.close()
+
+        # Result requested before a change is not cached after it
+        generation = self.fileio.cache.generation
+        self.fileio.cache.invalidate('me')
+        self.fileio.cache.set(('me', 'account'), {'success': True}, generation)
+        self.assertIsNone(self.fileio.cache.get(('me', 'account')))
+
+    def test_cache_patch(self):
+        path = './tt_offline/cache.db'
+        cache = MetadataCache(ttl=60, path=path)
+        nodes = [{'key': 'a', 'name': 'a.txt', 'maxDownloads': 1}, {'key': 'b', 'name': 'b.txt', 'maxDownloads': 1}]
+        cache.set(('list', 'account', None, None, None, None), {'success': True, 'count': 2, 'nodes': nodes})
+        cache.set(('list', 'account', None, 'maxDownloads', None, None), {'success': True, 'count': 2, 'nodes': nodes})
+        cache.set(('list', 'account', None, None, 0, 1), {'success': True, 'count': 2, 'nodes': nodes[:1]})
+
+        # Only fields a node has are patched, and results sorted by a changed field are dropped
+        cache.patch_node('a', {'maxDownloads': 5, 'link': 'ignored'})
+        self.assertEqual({'key': 'a', 'name': 'a.txt', 'maxDownloads': 5},
+                         cache.get(('list', 'account', None, None, None, None))['nodes'][0])
+        self.assertIsNone(cache.get(('list', 'account', None, 'maxDownloads', None, None)))
+
+        # Deleted file is removed from unpaginated results, paginated results are dropped
+        cache.remove_node('b')
+        self.assertEqual((1, ['a']), (cache.get(('list', 'account', None, None, None, None))['count'],
+                                      [node['key'] for node in
+                                       cache.get(('list', 'account', None, None, None, None))['nodes']]))
+        self.assertIsNone(cache.get(('list', 'account', None, None, 0, 1)))
+        cache.close()
+
+        # Results and patches survive restart
+        cache = MetadataCache(ttl=60, path=path)
+        self.assertEqual([{'key': 'a', 'name': 'a.txt', 'maxDownloads': 5}],
+                         cache.get(('list', 'account', None, None, None, None))['nodes'])
+        cache.clear()
+        cache.close()
+        cache = MetadataCache(ttl=60, path=path)
+        self.assertIsNone(cache.get(('list', 'account', None, None, None, None)))
+        cache.close()
+
+        # Instance patches its own cached results on update and delete, without listing again
+        self.fileio.cache = MetadataCache(ttl=60)
+        key = self.fileio.upload('./tt_offline/a.txt')['key']
+        self.fileio.list()
+        count = self.server.request_count
+        self.fileio.update(key, max_downloads=3)
+        self.assertEqual(3, self.fileio.list()['nodes'][0]['maxDownloads'])
+        self.fileio.delete(key)
+        self.assertEqual(0, self.fileio.list()['count'])
+        self.assertEqual(count + 2, self.server.request_count)
+
+    def test_dedup(self):
+        self.fileio.dedup = DedupIndex()
+        key = self.fileio.upload('./tt_offline/a.txt')['key']
+        resp = self.fileio.upload('./tt_offline/a.txt')
+        self.assertTrue(resp['deduplicated'])
+        self.assertEqual(key, resp['key'])
+        self.fileio.delete(key)
+        key = self.fileio.upload('./tt_offline/a.txt')['key']
+
+        # Download by anyone else uses up the only download, so the file is uploaded again
+        self.LocalFileio.download(key)
+        resp = self.fileio.upload('./tt_offline/a.txt')
+        self.assertNotIn('deduplicated', resp)
+        self.assertNotEqual(key, resp['key'])
+
+        # Relative expires counts from each upload, so the file is extended to expire no sooner than asked
+        first = self.fileio.upload('./tt_offline/a.txt', expires='2m', max_downloads=None)
+        time.sleep(1.5)
+        second = self.fileio.upload('./tt_offline/a.txt', expires='2m', max_downloads=None)
+        self.assertEqual((first.key, True), (second.key, second['deduplicated']))
+        self.assertGreater(second.expires, first.expires)
+
+        # Without auth, files with limited downloads can not be checked and are never reused
+        AnonymousFileio = type('AnonymousFileio', (self.LocalFileio,), {'dedup': DedupIndex()})
+        key = AnonymousFileio.upload('./tt_offline/a.txt')['key']
+        self.assertNotEqual(key, AnonymousFileio.upload('./tt_offline/a.txt')['key'])
+        key = AnonymousFileio.upload('./tt_offline/a.txt', expires='2m', max_downloads=None)['key']
+        time.sleep(1.5)
+        self.assertNotEqual(key, AnonymousFileio.upload('./tt_offline/a.txt', expires='2m', max_downloads=None)['key'])
+        AnonymousFileio.close()
+
+    def test_download_parallel(self):
+        content = os.urandom(1000003)
+        key = self.fileio.upload(io.BytesIO(content), filename='big.bin', max_downloads=100)['key']
+        resp = self.fileio.download_parallel(key, './tt_offline/', part_size=100000, max_workers=4)
+        self.assertEqual(11, len(resp['chunks']))
+        with open('./tt_offline/big.bin', 'rb') as f:
+            self.assertEqual(content, f.read())
+
+        self.server.honour_range = False
+        resp = self.fileio.download_parallel(key, './tt_offline/big.bin', part_size=100000)
+        self.assertEqual(1, len(resp['chunks']))
+        with open('./tt_offline/big.bin', 'rb') as f:
+            self.assertEqual(content, f.read())
+
+        # Partial content of unknown size is asked again as a whole, instead of saving the first part only
+        self.server.honour_range = True
+        self.server.range_length = False
+        resp = self.fileio.download_parallel(key, './tt_offline/big.bin', part_size=100000)
+        self.assertEqual((True, 200, 1), (resp['success'], resp['status'], len(resp['chunks'])))
+        with open('./tt_offline/big.bin', 'rb') as f:
+            self.assertEqual(content, f.read())
+        self.server.range_length = True
+
+        # Parts over max_downloads fail, and no partial file is left behind
+        self.server.honour_range = True
+        key = self.fileio.upload(io.BytesIO(content[:500000]), filename='part.bin', max_downloads=3)['key']
+        self.assertFalse(self.fileio.download_parallel(key, './tt_offline/', part_size=100000)['success'])
+        self.assertEqual(['a.txt', 'big.bin'], sorted(os.listdir('./tt_offline')))
+
+    def test_resume(self):
+        content = os.urandom(300000)
+        key = self.fileio.upload(io.BytesIO(content), filename='big.bin', max_downloads=5)['key']
+        self.fileio.checkpoint_size = 50000
+        self.server.drop_after = 120000
+        resp = self.fileio.download(key, './tt_offline/', chunk_size=10000, resume=True)
+        self.assertFalse(resp['success'])
+        self.assertGreaterEqual(resp['offset'], 100000)
+        self.assertTrue(os.path.exists('./tt_offline/{}.part'.format(key)))
+
+        self.server.drop_after = None
+        received = []
+        self.fileio.add_hook('request_end', lambda info: received.append(info['bytes_received']))
+        resp = self.fileio.download(key, './tt_offline/', resume=True)
+        self.assertTrue(resp['success'])
+        self.assertEqual(300000 - 120000, received[-1])
+        self.assertEqual(['a.txt', 'big.bin'], sorted(os.listdir('./tt_offline')))
+        with open('./tt_offline/big.bin', 'rb') as f:
+            self.assertEqual(content, f.read())
+
+    def test_lifecycle(self):
+        seeded = self.fileio.upload('./tt_offline/a.txt', expires='2h')
+        done = threading.Event()
+        results = {}
+
+        def callback(key, action, result):
+            results[key] = (action, result)
+            if len(results) == 2:
+                done.set()
+        lifecycle = LifecycleManager(lead_time=1800, extend_by='1d', callback=callback).attach(self.fileio)
+        listed = []
+        self.fileio.add_hook('request_end', lambda info: listed.append(info) if info['method'] == 'GET' else None)
+        try:
+            extended = self.fileio.upload('./tt_offline/a.txt', expires='10m')
+            deleted = self.fileio.upload('./tt_offline/a.txt', expires='5m', auto_delete=False)
+            lifecycle.track(deleted, action='delete')
+            self.assertTrue(done.wait(10))
+        finally:
+            lifecycle.close()
+        self.assertEqual('extend', results[extended.key][0])
+        self.assertGreater(results[extended.key][1]['expires'], seeded.expires)
+        self.assertEqual(('delete', True), (results[deleted.key][0], results[deleted.key][1]['success']))
+        self.assertEqual([seeded.key, extended.key], [key for _, key, _ in lifecycle.schedule()])
+        self.assertEqual([], listed)
+        self.assertIsNone(self.fileio.lifecycle)
+
+    def test_lifecycle_errors(self):
+        called = threading.Event()
+
+        def callback(key, action, result):
+            called.set()
+            raise ValueError('callback failed')
+        lifecycle = LifecycleManager(lead_time=1800, callback=callback).attach(self.fileio)
+        try:
+            with self.assertLogs(LifecycleManager.__module__) as logs:
+                self.fileio.upload('./tt_offline/a.txt', expires='10m')
+                self.assertTrue(called.wait(10))
+                self.fileio.update_many = None  # Burst fails as a whole
+                lifecycle.track({'key': 'missing', 'expires': datetime.now(timezone.utc).isoformat()})
+                deadline = time.time() + 10
+                while len(logs.records) < 2 and time.time() < deadline:
+                    time.sleep(0.01)
+            self.assertTrue(lifecycle._thread.is_alive())
+            self.assertIn('callback failed', logs.output[0])
+            self.assertIn('missing', logs.output[1])
+        finally:
+            lifecycle.close()
+
+    def test_journal(self):
+        journal = UploadJournal()
+        with open('./tt_offline/b.txt', "w") as f:
+            f.write("World")
+        files = ['./tt_offline/a.txt', './tt_offline/b.txt']
+        keys = {path: resp['key'] for path, resp in self.fileio.upload_many(files, journal=journal)}
+        results = dict(self.fileio.upload_many(files, journal=journal))
+        self.assertTrue(all(resp['journaled'] for resp in results.values()))
+        self.assertEqual(keys, {path: resp['key'] for path, resp in results.items()})
+
+        with open('./tt_offline/b.txt', "w") as f:
+            f.write("World!")
+        results = dict(self.fileio.upload_many(files, journal=journal))
+        self.assertNotIn('journaled', results['./tt_offline/b.txt'])
+        self.assertEqual([], journal.pending())
+
+    def test_compress(self):
+        content = b'Hello fileio\n' * 100000
+        resp = self.fileio.upload(io.BytesIO(content), filename='log.txt', compress='gzip', max_downloads=4)
+        self.assertTrue(resp['success'])
+        self.assertEqual('log.txt.fileio.gz', resp['name'])
+        self.assertLess(resp['size'], len(content) // 10)
+        self.assertEqual(content, self.fileio.download(resp['key'])['content'])
+        self.assertEqual('log.txt', self.fileio.download(resp['key'], './tt_offline/')['name'])
+        with self.fileio.open_download(resp['key']) as f:
+            self.assertEqual(content, f.read())
+        self.assertEqual(resp['size'], len(self.fileio.download(resp['key'], decompress=False)['content']))
+        self.assertRaises(ValueError, self.fileio.upload, './tt_offline/a.txt', compress='rar')
+        with mock.patch.dict(sys.modules, {'zstandard': None}):
+            self.assertRaises(ImportError, self.fileio.upload, './tt_offline/a.txt', compress='zstd')
+
+    def test_tree(self):
+        os.makedirs('./tt_offline/tree/sub/deep')
+        contents = {'a.txt': b'A' * 5000, 'sub/b.bin': os.urandom(20000), 'sub/deep/c.txt': b'C' * 3000,
+                    'sub/deep/d.txt': b'D'}
+        for relpath, content in contents.items():
+            with open(os.path.join('./tt_offline/tree', relpath), 'wb') as f:
+                f.write(content)
+
+        for shards, compress in ((1, None), (3, 'gzip')):
+            manifest = self.fileio.upload_tree('./tt_offline/tree', shards=shards, compress=compress)
+            self.assertTrue(manifest['success'])
+            self.assertEqual(shards, len(manifest['shards']))
+            self.assertEqual(sorted(contents), sorted(manifest['files']))
+            dest = './tt_offline/restored{}'.format(shards)
+            resp = self.fileio.download_tree(manifest, dest)
+            self.assertTrue(resp['success'])
+            self.assertEqual(sorted(contents), resp['files'])
+            for relpath, content in contents.items():
+                with open(os.path.join(dest, relpath), 'rb') as f:
+                    self.assertEqual(content, f.read())
+        self.assertFalse(self.fileio.download_tree(manifest, dest)['success'])
+
+    def test_cli(self):
+        def run(*argv):
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                status = main(['--api-key', 'offline-api-key', '--url', self.server.url.rstrip('/'), '-j', '4'] + list(argv))
+            return status, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+        with open('./tt_offline/b.txt', "w") as f:
+            f.write("World")
+        status, results = run('upload', './tt_offline/*.txt', '--max-downloads', '2')
+        self.assertEqual(0, status)
+        self.assertEqual(['./tt_offline/a.txt', './tt_offline/b.txt'], sorted(resp['input'] for resp in results))
+        keys = sorted(resp['key'] for resp in results)
+        self.assertEqual(keys, sorted(node['key'] for node in run('list', '--all')[1]))
+        self.assertEqual(10, run('me')[1][0]['usedStorageBytes'])
+
+        status, results = run('download', keys[0], keys[1], '-o', './tt_offline/out')
+        self.assertEqual(0, status)
+        self.assertEqual(['a.txt', 'b.txt'], sorted(os.listdir('./tt_offline/out')))
+        status, results = run('rm', *keys, 'missing')
+        self.assertEqual(1, status)
+        self.assertEqual(2, sum(resp['success'] for resp in results))
+
+    def test_lazy_import(self):
+        src = os.path.dirname(os.path.dirname(os.path.abspath(sys.modules[Fileio.__module__].__file__)))
+        output = subprocess.run(
+            [sys.executable, '-c', 'import sys; from fileio_wrapper import Fileio, RetryPolicy; import fileio_wrapper.cli; '
+                                   'print(sorted({"requests", "urllib3", "aiohttp", "zstandard", "lz4"} & set(sys.modules)))'],
+            stdout=subprocess.PIPE, env=dict(os.environ, PYTHONPATH=src), universal_newlines=True, check=True).stdout
+        self.assertEqual('[]', output.strip())
+
+    def test_hooks_metrics(self):
+        received = []
+        self.fileio.add_hook('bytes_received', lambda info: received.append(info['bytes_received']))
+        metrics = MetricsCollector().attach(self.fileio)
+        key = self.fileio.upload('./tt_offline/a.txt', max_downloads=2)['key']
+        self.fileio.download(key)
+        self.assertEqual(5, received[-1])
+        stats = metrics.snapshot()
+        self.assertEqual(1, stats['POST']['count'])
+        self.assertEqual(5, stats['GET']['bytes_received'])
+
+        # Failing callback is logged, and neither breaks the request nor skips the other callbacks
+        def failing(info):
+            raise ValueError('hook failed')
+        self.fileio.add_hook('bytes_received', failing)
+        self.fileio.add_hook('bytes_received', lambda info: received.append(info['bytes_received']))
+        with self.assertLogs(Fileio.__module__) as logs:
+            self.assertEqual(b'Hello', self.fileio.download(key)['content'])
+        self.assertEqual([5, 5], received[-2:])
+        self.assertIn('hook failed', logs.output[0])
+
+        # Name is resolved on new connections only, and plain HTTP has no TLS handshake
+        ended = []
+        NamedFileio = type('NamedFileio', (Fileio,), {'url': self.server.url.replace('127.0.0.1', 'localhost')})
+        fileio = NamedFileio('offline-api-key')
+        fileio.add_hook('request_end', ended.append)
+        try:
+            fileio.me()
+            fileio.me()
+        finally:
+            fileio.close()
+        self.assertTrue(0 < ended[0]['dns'] <= ended[0]['connect'])
+        self.assertEqual((0.0, 0.0, 0.0), (ended[1]['connect'], ended[1]['dns'], ended[1]['tls']))
+        self.assertEqual(0.0, ended[0]['tls'])
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncFileioOffline(unittest.IsolatedAsyncioTestCase):
+    """AsyncFileio against the local stand-in of file.io"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockFileioServer().start()
+        cls.LocalAsyncFileio = type('LocalAsyncFileio', (AsyncFileio,), {'url': cls.server.url})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    async def asyncSetUp(self):
+        self.server.files.clear()
+        self.fileio = self.LocalAsyncFileio('offline-api-key')
+        os.makedirs('./tt_offline', exist_ok=True)
+        with open('./tt_offline/a.txt', "w") as f:
+            f.write("Hello")
+
+    async def asyncTearDown(self):
+        await self.fileio.close()
+        await self.LocalAsyncFileio.close()
+        shutil.rmtree('./tt_offline')
+
+    async def test_upload_download(self):
+        resp = await self.LocalAsyncFileio.upload(pathlib.Path('./tt_offline/a.txt'), expires='5m')
+        self.assertIsInstance(resp, UploadResult)
+        self.assertEqual('a.txt', resp['name'])
+        resp = await self.LocalAsyncFileio.download(resp['key'])
+        self.assertEqual(b'Hello', resp['content'])
+        self.assertFalse((await self.LocalAsyncFileio.download(resp['key']))['success'])
+
+        content = os.urandom(200000)
+        key = (await self.fileio.upload(content, filename='big.bin', max_downloads=3))['key']
+        resp = await self.fileio.download(key, './tt_offline/', chunk_size=10000)
+        self.assertEqual('big.bin', resp['name'])
+        with open('./tt_offline/big.bin', 'rb') as f:
+            self.assertEqual(content, f.read())
+
+        # Body broken after first chunk leaves existing file untouched and no temp file behind
+        self.server.drop_after = 100000
+        try:
+            self.assertFalse((await self.fileio.download(key, './tt_offline/', chunk_size=10000))['success'])
+        finally:
+            self.server.drop_after = None
+        self.assertEqual(['a.txt', 'big.bin'], sorted(os.listdir('./tt_offline')))
+        with open('./tt_offline/big.bin', 'rb') as f:
+            self.assertEqual(content, f.read())
+
+        chunks = [chunk async for chunk in self.fileio.iter_download(key, chunk_size=10000)]
+        self.assertLessEqual(max(map(len, chunks)), 10000)
+        self.assertEqual(content, b''.join(chunks))
+        with self.assertRaises(FileioError):
+            async for _ in self.fileio.iter_download('missing'):
+                pass
+
+    async def test_async_iterable_upload(self):
+        async def produce():
+            for _ in range(4):
+                yield b'x' * 10000
+        resp = await self.fileio.upload(produce(), filename='stream.bin')
+        self.assertEqual(40000, resp['size'])
+        self.assertEqual(b'x' * 40000, (await self.fileio.download(resp['key']))['content'])
+
+    async def test_list_me_update_delete(self):
+        results = await asyncio.gather(*(self.fileio.upload('./tt_offline/a.txt') for _ in range(3)))
+        key = results[0]['key']
+        self.assertEqual(3, (await self.fileio.list())['count'])
+        self.assertEqual(15, (await self.fileio.me()).used_storage_bytes)
+        self.assertEqual(10, (await self.fileio.update(key, max_downloads=10))['maxDownloads'])
+        resp = await self.fileio.update(key, b'Hello again', filename='b.txt', mode='replace_all')
+        self.assertEqual(('b.txt', 11), (resp['name'], resp['size']))
+        self.assertTrue((await self.fileio.delete(key))['success'])
+        self.assertEqual(2, (await self.fileio.list())['count'])
+
+
+if __name__ == '__main__':
+    unittest.main()